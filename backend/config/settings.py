@@ -2,20 +2,87 @@ from pydantic_settings import BaseSettings
 from pydantic import Field
 
 class Settings(BaseSettings):
-    google_maps_api_key: str = Field(..., alias="GOOGLE_MAPS_API_KEY")
-    serp_api_key: str = Field(..., alias="SERP_API_KEY")
-    weather_api_key: str = Field(..., alias="WEATHER_API_KEY")
-    gemini_api_key: str = Field(..., alias="GEMINI_API_KEY")
+    # Not required at import (tooling, tests, benchmarks); the app warns at startup if any is missing
+    google_maps_api_key: str = Field("", alias="GOOGLE_MAPS_API_KEY")
+    serp_api_key: str = Field("", alias="SERP_API_KEY")
+    weather_api_key: str = Field("", alias="WEATHER_API_KEY")
+    gemini_api_key: str = Field("", alias="GEMINI_API_KEY")
 
     weather_provider: str = Field("openweather", alias="WEATHER_PROVIDER")
-    http_timeout_seconds: int = Field(30, alias="HTTP_TIMEOUT_SECONDS")
+    tgn_model_path: str = Field("tgn_model.pth", alias="TGN_MODEL_PATH")
+    http_timeout_seconds: float = Field(30.0, alias="HTTP_TIMEOUT_SECONDS")  # default for providers without their own
+    http2_enabled: bool = Field(False, alias="HTTP2_ENABLED")
+    http_keepalive_expiry_seconds: float = Field(30.0, alias="HTTP_KEEPALIVE_EXPIRY_SECONDS")
+    serp_timeout_seconds: float | None = Field(None, alias="SERP_TIMEOUT_SECONDS")
+    geocode_timeout_seconds: float | None = Field(None, alias="GEOCODE_TIMEOUT_SECONDS")
+    weather_timeout_seconds: float | None = Field(None, alias="WEATHER_TIMEOUT_SECONDS")
+    scrape_timeout_seconds: float | None = Field(None, alias="SCRAPE_TIMEOUT_SECONDS")
+    serp_max_concurrency: int = Field(5, alias="SERP_MAX_CONCURRENCY")
+    scrape_max_pages: int = Field(8, alias="SCRAPE_MAX_PAGES")
+    scrape_max_bytes: int = Field(262144, alias="SCRAPE_MAX_BYTES")
+    scrape_per_host_limit: int = Field(2, alias="SCRAPE_PER_HOST_LIMIT")
+    scrape_deadline_seconds: float = Field(8.0, alias="SCRAPE_DEADLINE_SECONDS")
+    text_extractor: str = Field("bs4", alias="TEXT_EXTRACTOR")          # bs4 | lxml
+    text_extract_mode: str = Field("process", alias="TEXT_EXTRACT_MODE")  # process | thread | inline
+    text_extract_workers: int = Field(2, alias="TEXT_EXTRACT_WORKERS")
     agent_timeout_seconds: int = Field(40, alias="AGENT_TIMEOUT_SECONDS")
+    geocode_agent_timeout_seconds: float = Field(10.0, alias="GEOCODE_AGENT_TIMEOUT_SECONDS")
+    trade_agent_timeout_seconds: float = Field(25.0, alias="TRADE_AGENT_TIMEOUT_SECONDS")
+    news_agent_timeout_seconds: float = Field(40.0, alias="NEWS_AGENT_TIMEOUT_SECONDS")
+    weather_agent_timeout_seconds: float = Field(15.0, alias="WEATHER_AGENT_TIMEOUT_SECONDS")
+    political_agent_timeout_seconds: float = Field(25.0, alias="POLITICAL_AGENT_TIMEOUT_SECONDS")
+    gscpi_agent_timeout_seconds: float = Field(25.0, alias="GSCPI_AGENT_TIMEOUT_SECONDS")
+    combined_agent_timeout_seconds: float = Field(25.0, alias="COMBINED_AGENT_TIMEOUT_SECONDS")
+    llm_combined_mode: bool = Field(False, alias="LLM_COMBINED_MODE")
+    batch_max_lanes: int = Field(500, alias="BATCH_MAX_LANES")
+    batch_max_concurrency: int = Field(16, alias="BATCH_MAX_CONCURRENCY")
     scoring_state_path: str = Field("./data/scoring_state.json", alias="SCORING_STATE_PATH")
+    scoring_flush_every: int = Field(50, alias="SCORING_FLUSH_EVERY")
+    weather_geohash_precision: int = Field(5, alias="WEATHER_GEOHASH_PRECISION")  # 5 ~ 4.9 km cells
+    weather_cache_radius_km: float = Field(5.0, alias="WEATHER_CACHE_RADIUS_KM")
+    weather_route_samples: int = Field(3, alias="WEATHER_ROUTE_SAMPLES")  # points between the lane ends
+    gscpi_store_path: str = Field("./data/gscpi.csv", alias="GSCPI_STORE_PATH")
+    gscpi_seed_path: str = Field("./data/gscpi_seed.csv", alias="GSCPI_SEED_PATH")
+    gscpi_history_url: str = Field(
+        "https://www.newyorkfed.org/medialibrary/research/interactives/gscpi/downloads/gscpi_data.xlsx",
+        alias="GSCPI_HISTORY_URL",
+    )  # NY Fed published monthly series (XLSX or CSV)
+    gscpi_refresh_interval_seconds: float = Field(6 * 3600, alias="GSCPI_REFRESH_INTERVAL_SECONDS")
+    scoring_flush_interval_seconds: float = Field(5.0, alias="SCORING_FLUSH_INTERVAL_SECONDS")
+    geocode_cache_path: str = Field("./data/geocode_cache.sqlite3", alias="GEOCODE_CACHE_PATH")
+    geocode_cache_size: int = Field(4096, alias="GEOCODE_CACHE_SIZE")
+    geocode_cache_ttl_seconds: float = Field(30 * 86400, alias="GEOCODE_CACHE_TTL_SECONDS")
+    geocode_negative_ttl_seconds: float = Field(86400, alias="GEOCODE_NEGATIVE_TTL_SECONDS")
+    analyze_cache_ttl_seconds: float = Field(300.0, alias="ANALYZE_CACHE_TTL_SECONDS")  # 0 disables
+    analyze_cache_grace_seconds: float = Field(1800.0, alias="ANALYZE_CACHE_GRACE_SECONDS")  # served stale while refreshing
+    analyze_cache_degraded_ttl_seconds: float = Field(30.0, alias="ANALYZE_CACHE_DEGRADED_TTL_SECONDS")
+    analyze_cache_size: int = Field(2048, alias="ANALYZE_CACHE_SIZE")
+    result_store_path: str = Field("./data/results.sqlite3", alias="RESULT_STORE_PATH")
+    result_store_batch_size: int = Field(256, alias="RESULT_STORE_BATCH_SIZE")
+    result_store_flush_interval_seconds: float = Field(0.5, alias="RESULT_STORE_FLUSH_INTERVAL_SECONDS")
+    result_store_queue_size: int = Field(10000, alias="RESULT_STORE_QUEUE_SIZE")  # results dropped beyond this
+    analytics_bucket_seconds: float = Field(3600.0, alias="ANALYTICS_BUCKET_SECONDS")
+    analytics_window_buckets: int = Field(24, alias="ANALYTICS_WINDOW_BUCKETS")  # trend: this window vs. the one before
+    analytics_trend_tolerance: float = Field(0.02, alias="ANALYTICS_TREND_TOLERANCE")  # mean risk change below = "stable"
+    analytics_hll_precision: int = Field(12, alias="ANALYTICS_HLL_PRECISION")
+    metrics_loop_lag_interval_seconds: float = Field(0.5, alias="METRICS_LOOP_LAG_INTERVAL_SECONDS")
+    alert_rules_path: str = Field("./data/alert_rules.json", alias="ALERT_RULES_PATH")  # defaults if absent
+    alert_max_lanes: int = Field(10000, alias="ALERT_MAX_LANES")
+    alert_recent_size: int = Field(200, alias="ALERT_RECENT_SIZE")
+    alert_ws_queue_size: int = Field(100, alias="ALERT_WS_QUEUE_SIZE")
+    alert_ws_send_timeout_seconds: float = Field(10.0, alias="ALERT_WS_SEND_TIMEOUT_SECONDS")
     log_level: str = Field("INFO", alias="LOG_LEVEL")
 
     enable_gdelt: bool = Field(False, alias="ENABLE_GDELT")
     enable_comtrade: bool = Field(False, alias="ENABLE_COMTRADE")
     allow_gemini_fallback: bool = Field(True, alias="ALLOW_GEMINI_FALLBACK")
+    gemini_async_mode: str = Field("native", alias="GEMINI_ASYNC_MODE")  # native | executor
+    gemini_max_concurrency: int = Field(8, alias="GEMINI_MAX_CONCURRENCY")
+
+    def missing_api_keys(self) -> list[str]:
+        keys = {"GOOGLE_MAPS_API_KEY": self.google_maps_api_key, "SERP_API_KEY": self.serp_api_key,
+                "WEATHER_API_KEY": self.weather_api_key, "GEMINI_API_KEY": self.gemini_api_key}
+        return [name for name, value in keys.items() if not value]
 
     class Config:
         env_file = ".env"
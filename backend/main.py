@@ -1,13 +1,118 @@
 from __future__ import annotations
 import asyncio
-from fastapi import FastAPI
+import logging
+import time
+from contextlib import asynccontextmanager
+import json
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from orchestrator.utils.schema import AnalyzeRequest, AnalyzeResponse
-from orchestrator.orchestrator import run_analysis
+from orchestrator.utils.schema import AnalyzeRequest, AnalyzeResponse, BatchAnalyzeRequest, BatchAnalyzeResponse
+from orchestrator.orchestrator import cached_analysis, run_batch, stream_analysis, on_result
+from orchestrator.alerts import alert_engine
+from orchestrator.history import result_store
+from orchestrator.analytics import overview_stats
 from models.tgn_model import tgn
+from orchestrator.utils.api_clients import http_pool, init_gemini, shutdown_gemini, gemini_stats
+from orchestrator.utils.textextract import shutdown_executor
+from orchestrator.utils.scoring import scoring_state
+from orchestrator.utils.cache import cache_stats, aclose_caches
+from orchestrator.utils.geocoding import geocode_cache
+from orchestrator.utils import metrics
+from orchestrator.agents.gscpi_agent import gscpi_store, fetch_gscpi
 from config.settings import settings
 
-app = FastAPI(title="Supply Chain Risk API", version="1.0.0")
+logger = logging.getLogger(__name__)
+
+# ----- Scrape-time metrics: read from counters the components already keep -----
+def _upstream_requests():
+    out = [({"provider": p}, c["requests"]) for p, c in http_pool.counters.items()]
+    return out + [({"provider": "gemini"}, gemini_stats["requests"])]
+
+def _upstream_errors():
+    out = []
+    for p, c in http_pool.counters.items():
+        out += [({"provider": p, "kind": "exception"}, c["errors"]), ({"provider": p, "kind": "status"}, c["error_responses"])]
+    return out + [({"provider": "gemini", "kind": "exception"}, gemini_stats["errors"])]
+
+def _cache_lookups():
+    caches = cache_stats()["caches"]
+    out = [({"cache": name, "result": r}, caches[name][k])
+           for name in ("news_cache", "weather_cache") for r, k in (("hit", "hits"), ("miss", "misses"))]
+    out += [({"cache": "analyze_cache", "result": r}, caches["analyze_cache"][r]) for r in ("hit", "stale", "miss")]
+    g = geocode_cache.lookups
+    out += [({"cache": "geocode_cache", "result": "hit"}, g["memory_hits"] + g["db_hits"]),
+            ({"cache": "geocode_cache", "result": "miss"}, g["misses"])]
+    return out
+
+def _single_flight():
+    return [({"name": n, "outcome": o}, sf[o]) for n, sf in cache_stats()["single_flight"].items() for o in ("executed", "coalesced")]
+
+metrics.Collector("lamda_upstream_requests_total", "counter", "Upstream API calls per provider.", _upstream_requests)
+metrics.Collector("lamda_upstream_errors_total", "counter",
+                  "Failed upstream calls: transport exceptions, or HTTP status >= 400.", _upstream_errors)
+metrics.Collector("lamda_upstream_connections_opened_total", "counter", "New TCP connections per provider pool.",
+                  lambda: [({"provider": p}, c["connections_opened"]) for p, c in http_pool.counters.items()])
+metrics.Collector("lamda_cache_requests_total", "counter", "Cache lookups by result.", _cache_lookups)
+metrics.Collector("lamda_singleflight_calls_total", "counter", "Single-flight calls that ran vs. joined an in-flight one.", _single_flight)
+metrics.Collector("lamda_result_store_rows_total", "counter", "History store rows by outcome.",
+                  lambda: [({"outcome": k}, result_store.counts[k]) for k in ("written", "dropped", "write_errors")])
+metrics.Collector("lamda_alerts_total", "counter", "Alerts raised by the rules engine.", lambda: [({}, alert_engine._seq)])
+metrics.Collector("lamda_alert_subscribers", "gauge", "Connected alert WebSocket clients.",
+                  lambda: [({}, len(alert_engine.subscribers))])
+metrics.Collector("lamda_model_loaded", "gauge", "1 if the TGN model is loaded (0: weighted blend).",
+                  lambda: [({"backend": tgn.backend}, int(tgn.loaded))])
+
+def _warm_up():
+    # google.generativeai is imported here, not at import time. Runs in a thread so the
+    # server starts accepting requests immediately; early callers wait on the lock.
+    try:
+        init_gemini()
+    except RuntimeError as e:
+        logger.warning("Gemini not initialised: %s", e)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    missing = settings.missing_api_keys()
+    if missing:
+        logger.warning("Missing API keys (affected agents will use defaults): %s", ", ".join(missing))
+    warm_up = asyncio.create_task(asyncio.to_thread(_warm_up))
+    # Alerts: every pipeline result and GSCPI refresh is evaluated as it arrives
+    alert_engine.bind_loop(asyncio.get_running_loop())
+    on_result(alert_engine.observe)
+    result_store.start()
+    on_result(result_store.record)  # enqueue only; written in batches by the store's thread
+    # Dashboard aggregates: live from now on, earlier results replayed once from the store
+    on_result(overview_stats.observe)
+    if overview_stats.observe_alerts not in alert_engine.listeners:
+        alert_engine.listeners.append(overview_stats.observe_alerts)
+    replay = asyncio.create_task(asyncio.to_thread(
+        overview_stats.replay,
+        result_store.scan("ts, lane, seller_name, seller_location, risk_score, risk_label, agents", until=time.time()),
+    ))
+    if gscpi_store.latest():
+        alert_engine.observe_gscpi(*gscpi_store.latest())  # baseline for the delta rule
+    if alert_engine.observe_gscpi not in gscpi_store.listeners:
+        gscpi_store.listeners.append(alert_engine.observe_gscpi)
+    await http_pool.start()
+    flusher = asyncio.create_task(scoring_state.run_flusher(settings.scoring_flush_interval_seconds))
+    gscpi_refresher = asyncio.create_task(
+        gscpi_store.run_refresher(fetch_gscpi, settings.gscpi_refresh_interval_seconds)
+    )
+    lag_monitor = asyncio.create_task(metrics.run_loop_lag_monitor(settings.metrics_loop_lag_interval_seconds))
+    try:
+        yield
+    finally:
+        for task in (flusher, gscpi_refresher, lag_monitor):
+            task.cancel()
+        await asyncio.gather(flusher, gscpi_refresher, lag_monitor, warm_up, replay, return_exceptions=True)
+        await aclose_caches()
+        await asyncio.to_thread(result_store.close)
+        await http_pool.aclose()
+        shutdown_gemini()
+        shutdown_executor()
+
+app = FastAPI(title="Supply Chain Risk API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,33 +120,58 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Age", "X-Cache"],
 )
+app.add_middleware(metrics.InFlightMiddleware)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 @app.get("/model/info")
 def model_info():
-    return {
-        "model_name": "TGN",
-        "model_class": "FixedTGN",
-        "f1_score": 0.45392434594234293,
-        "loaded_at": "2025-09-28T07:34:29.408680"
-    }
+    return tgn.info()
+
+@app.get("/analytics/gscpi")
+def analytics_gscpi(months: int = 24):
+    # Stored monthly GSCPI history (for trend charts)
+    return {"series": [{"month": m, "value": v} for m, v in gscpi_store.history(months)]}
+
+@app.get("/analytics/history")
+def analytics_history(component_type: str, seller_location: str, import_location: str,
+                      since: float | None = None, until: float | None = None, limit: int = 100):
+    # Stored results for one lane, newest first; since/until are unix seconds
+    lane = AnalyzeRequest(component_type=component_type, seller_location=seller_location, import_location=import_location)
+    return {"results": result_store.history(lane, since, until, min(max(limit, 1), 1000))}
 
 @app.get("/analytics/overview")
 def analytics_overview():
-    return {
-        "total_suppliers": 10000,
-        "active_routes": 24,
-        "active_alerts": 7,
-        "reliability_score": 89.2,
-        "risk_trend": "decreasing",
-        "last_updated": "2024-01-01T00:00:00Z"
-    }
+    # Maintained incrementally as results are produced; no history scan per request
+    return overview_stats.overview()
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    # Weak comparison (RFC 9110 13.1.2): W/ prefixes are ignored
+    if not if_none_match:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
 
 @app.post("/analyze", response_model=AnalyzeResponse)
-async def analyze(req: AnalyzeRequest):
+async def analyze(req: AnalyzeRequest, request: Request, response: Response):
     try:
-        # Run the full orchestrator with all AI agents
-        result = await run_analysis(req)
+        # Run the full orchestrator with all AI agents (repeat requests are served from the cache)
+        result, entry, state = await cached_analysis(req, refresh="no-cache" in request.headers.get("cache-control", ""))
+        age = entry.age()
+        headers = {
+            "ETag": entry.etag,
+            "Age": str(int(age)),
+            "Cache-Control": f"max-age={max(0, int(entry.ttl - age))}, stale-while-revalidate={int(settings.analyze_cache_grace_seconds)}",
+            "X-Cache": state.upper(),
+        }
+        if _etag_matches(request.headers.get("if-none-match"), entry.etag):
+            return Response(status_code=304, headers=headers)
+        response.headers.update(headers)
         return result
     except Exception as e:
         # If external APIs fail (demo keys), return a comprehensive mock response
@@ -49,8 +179,8 @@ async def analyze(req: AnalyzeRequest):
         from datetime import datetime, timezone
         import uuid
         
-        print(f"WARNING: Using mock response due to: {e}")
-        print("INFO: To run with real data, add your API keys to backend/.env")
+        metrics.analyze_fallbacks.inc()
+        logger.warning("Using mock response due to: %s (add your API keys to backend/.env for real data)", e)
         
         # Create a comprehensive mock response that shows the full pipeline
         mock_result = AnalyzeResponse(
@@ -179,12 +309,112 @@ async def analyze(req: AnalyzeRequest):
         )
         return mock_result
 
+def _sse(req: AnalyzeRequest) -> StreamingResponse:
+    async def events():
+        n = 0
+        try:
+            async for event, data in stream_analysis(req):
+                if event == "ping":
+                    yield ": ping\n\n"  # comment line keeps proxies from timing out
+                    continue
+                n += 1
+                yield f"id: {n}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': f'{type(e).__name__}: {e}'[:200]})}\n\n"
+        # On client disconnect Starlette cancels this generator; stream_analysis then
+        # cancels the agents still running.
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/analyze", response_model=AnalyzeResponse)
+async def analyze_get(request: Request, response: Response, component_type: str, seller_location: str,
+                      import_location: str, seller_name: str | None = None):
+    # Same as POST; lets browsers and HTTP caches revalidate with If-None-Match
+    return await analyze(AnalyzeRequest(component_type=component_type, seller_location=seller_location,
+                                        import_location=import_location, seller_name=seller_name), request, response)
+
+@app.post("/analyze/stream")
+async def analyze_stream(req: AnalyzeRequest):
+    return _sse(req)
+
+@app.get("/analyze/stream")
+async def analyze_stream_get(component_type: str, seller_location: str, import_location: str,
+                             seller_name: str | None = None):
+    # EventSource can only issue GETs
+    return _sse(AnalyzeRequest(component_type=component_type, seller_location=seller_location,
+                               import_location=import_location, seller_name=seller_name))
+
+@app.post("/analyze/batch", response_model=BatchAnalyzeResponse)
+async def analyze_batch(req: BatchAnalyzeRequest):
+    if len(req.requests) > settings.batch_max_lanes:
+        raise HTTPException(status_code=413, detail=f"At most {settings.batch_max_lanes} lanes per batch")
+    return await run_batch(req.requests)
+
 @app.get("/monitoring/alerts")
-def monitoring_alerts():
-    # Simple mock alerts (replace with real)
+def monitoring_alerts(since: int = 0, limit: int = 100):
+    # Recent alerts with id > `since` (poll with the previous `last_id`); pushed live on /monitoring/alerts/ws
+    alerts = alert_engine.since(since, limit)
     return {
-        "alerts": [
-            {"id": 1, "type": "weather", "severity": "high", "msg": "Storm risk near Kaohsiung port"},
-            {"id": 2, "type": "labor", "severity": "medium", "msg": "Container terminal slowdown"}
-        ]
-    }
\ No newline at end of file
+        "alerts": [a.model_dump(mode="json") for a in alerts],
+        "last_id": alerts[-1].id if alerts else since,
+        "engine": alert_engine.stats(),
+    }
+
+@app.websocket("/monitoring/alerts/ws")
+async def monitoring_alerts_ws(ws: WebSocket, since: int = 0):
+    """
+    Snapshot of recent alerts (id > `since`), then each new alert as it fires. A client
+    that falls behind loses the oldest queued alerts and gets {"type": "lagged"}; one
+    that stops reading is disconnected after ALERT_WS_SEND_TIMEOUT_SECONDS.
+    """
+    await ws.accept()
+    sub = alert_engine.subscribe()
+    timeout = settings.alert_ws_send_timeout_seconds
+
+    async def send(msg: dict):
+        await asyncio.wait_for(ws.send_json(msg), timeout)
+
+    async def drain_client():
+        # Nothing is expected from the client; reading is how a disconnect is noticed
+        while True:
+            await ws.receive_text()
+
+    reader = asyncio.create_task(drain_client())
+    try:
+        await send({"type": "snapshot", "alerts": [a.model_dump(mode="json") for a in alert_engine.since(since)]})
+        reported = 0
+        while True:
+            getter = asyncio.ensure_future(sub.queue.get())
+            await asyncio.wait({getter, reader}, return_when=asyncio.FIRST_COMPLETED)
+            if not getter.done():
+                getter.cancel()
+                break  # client went away
+            if sub.dropped > reported:
+                await send({"type": "lagged", "dropped": sub.dropped - reported})
+                reported = sub.dropped
+            await send({"type": "alert", "alert": getter.result().model_dump(mode="json")})
+    except (WebSocketDisconnect, asyncio.TimeoutError, RuntimeError):
+        pass
+    finally:
+        alert_engine.unsubscribe(sub)
+        reader.cancel()
+        await asyncio.gather(reader, return_exceptions=True)
+        try:
+            await ws.close()
+        except (RuntimeError, WebSocketDisconnect):
+            pass  # already closed
+
+@app.get("/monitoring/cache")
+def monitoring_cache():
+    # Single-flight executed vs. coalesced counts per agent, plus cache fill levels
+    return cache_stats()
+
+@app.get("/monitoring/result-store")
+def monitoring_result_store():
+    # Background writer: results written / batches / dropped (queue full) / write errors
+    return result_store.stats()
+
+@app.get("/monitoring/http-pool")
+def monitoring_http_pool():
+    # Per-provider request/connection counters; reuse_rate = 1 - new connections / requests
+    return {"providers": http_pool.stats()}
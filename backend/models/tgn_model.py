@@ -1,40 +1,51 @@
 from __future__ import annotations
 import os
-import torch
+from typing import Any, Dict, List, Sequence, Tuple
 import numpy as np
-from typing import Dict, Tuple
 import sys
-import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-from orchestrator.utils.scoring import weighted_risk
+from orchestrator.utils.scoring import FEATURES, risk_matrix
+from config.settings import settings
 
 class TGNWrapper:
     """
-    Tries to load tgn_model.pth and run inference.
-    If input shape mismatches or file absent, gracefully fall back to a weighted blend over normalized features.
+    Scores lanes with the weighted blend over normalized features, a whole batch in one
+    NumPy pass. tgn_model.pth only holds a FixedTGN state dict; the model definition it
+    was trained with isn't part of this repo, so it is not loaded until that definition
+    is recovered and validated against the recorded F1. `backend` reports the scorer.
     """
     def __init__(self, model_path: str = "tgn_model.pth"):
         self.model_path = model_path
-        self.model = None
         self.loaded = False
-        if os.path.exists(self.model_path):
-            try:
-                self.model = torch.load(self.model_path, map_location="cpu")
-                self.model.eval()
-                self.loaded = True
-            except Exception:
-                self.model = None
-                self.loaded = False
+        self.load_error = "FixedTGN model definition not available; using the weighted blend"
+
+    @property
+    def backend(self) -> str:
+        return "weighted_blend"
+
+    def info(self) -> Dict[str, Any]:
+        return {"backend": self.backend, "loaded": self.loaded, "model_path": self.model_path,
+                "error": self.load_error}
+
+    def predict_batch(self, batch: Sequence[Dict[str, float]]) -> List[Tuple[float, Dict[str, float]]]:
+        """
+        Score N lanes at once. Returns [(risk_score in [0,1], contribution_dict), ...];
+        contributions sum to the risk score, missing features count as neutral.
+        """
+        if not batch:
+            return []
+        N = np.array([[np.nan if f.get(k) is None else f[k] for k in FEATURES] for f in batch], dtype=float)
+        risk, contrib = risk_matrix(N)
+        return [
+            (float(np.clip(r, 0.0, 1.0)), dict(zip(FEATURES, row.tolist())))
+            for r, row in zip(risk, contrib)
+        ]
 
     def predict(self, norm_features: Dict[str, float]) -> Tuple[float, Dict[str, float]]:
         """
         Return (risk_score, contribution_dict)
         risk_score in [0,1]
         """
-        # If you have a real PyTorch forward path, map features to tensor here.
-        # Fallback: weighted blend
-        risk, contrib = weighted_risk(norm_features)
-        risk = float(np.clip(risk, 0.0, 1.0))
-        return risk, contrib
+        return self.predict_batch([norm_features])[0]
 
-tgn = TGNWrapper()
+tgn = TGNWrapper(settings.tgn_model_path)
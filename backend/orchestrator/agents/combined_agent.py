@@ -0,0 +1,99 @@
+from pydantic import BaseModel, ValidationError, field_validator
+from ..utils.api_clients import gemini_generate, parse_llm_json
+from ..utils.schema import TradeFeatures, PoliticalFeatures, GSCPIFeatures
+from ..utils.cache import coalesce
+
+# One structured request for the three small LLM feature groups (trade, political, GSCPI).
+COMBINED_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "trade": {
+            "type": "object",
+            "properties": {
+                "inventory_days": {"type": "number"},
+                "past_delay_days": {"type": "number"},
+                "edges": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "exporter": {"type": "string"},
+                            "importer": {"type": "string"},
+                            "trade_value_usd": {"type": "number"},
+                            "timestamp": {"type": "string"},
+                        },
+                        "required": ["exporter", "importer", "trade_value_usd", "timestamp"],
+                    },
+                },
+            },
+            "required": ["inventory_days", "past_delay_days", "edges"],
+        },
+        "political": {
+            "type": "object",
+            "properties": {
+                "sanction_flag": {"type": "integer"},
+                "political_risk_score": {"type": "number"},
+                "notes": {"type": "string"},
+            },
+            "required": ["sanction_flag", "political_risk_score"],
+        },
+        "gscpi": {
+            "type": "object",
+            "properties": {
+                "global_risk": {"type": "number"},
+                "timestamp": {"type": "string"},
+            },
+            "required": ["global_risk", "timestamp"],
+        },
+    },
+    "required": ["trade", "political", "gscpi"],
+}
+
+class _Trade(TradeFeatures):
+    inventory_days: float
+    past_delay_days: float
+
+class _Political(PoliticalFeatures):
+    @field_validator("political_risk_score")
+    @classmethod
+    def _in_unit_range(cls, v: float) -> float:
+        if not 0.0 <= v <= 1.0:
+            raise ValueError("political_risk_score must be in [0, 1]")
+        return v
+
+class CombinedFeatures(BaseModel):
+    trade: _Trade
+    political: _Political
+    gscpi: GSCPIFeatures
+
+@coalesce("combined", key=lambda c, s, i, n: f"{c}|{s}|{i}|{n or ''}")
+async def combined_features(component_type: str, seller_loc: str, import_loc: str,
+                            seller_name: str | None) -> tuple[TradeFeatures, PoliticalFeatures, GSCPIFeatures] | None:
+    """
+    Trade, political and GSCPI features from a single schema-constrained Gemini call.
+    Returns None if the answer doesn't validate; callers then use the per-agent calls.
+    """
+    prompt = f"""
+You are a supply-chain and geopolitics analyst. For semiconductor/electronics shipments (HS 8541, 8542):
+component="{component_type}", seller="{seller_name or 'unknown'}", seller_loc="{seller_loc}", import_loc="{import_loc}".
+Return one JSON object with three groups:
+- trade: recent trade signals between the two locations. inventory_days (5-90 typical), past_delay_days (0-60 typical),
+  edges: exporter->importer with rough trade_value_usd and timestamp "YYYY-MM" in the last 1-2 months.
+- political: sanctions and political risk relevant to this lane in the past 30 days. sanction_flag 0 or 1,
+  political_risk_score in [0, 1], short notes. If uncertain, sanction_flag=0 and political_risk_score near 0.3.
+- gscpi: the latest NY Fed Global Supply Chain Pressure Index (monthly) as global_risk, timestamp "YYYY-MM".
+Be conservative; if unsure, provide plausible conservative values.
+"""
+    try:
+        resp = await gemini_generate(
+            [{"text": prompt}],
+            generation_config={"response_mime_type": "application/json", "response_schema": COMBINED_SCHEMA},
+        )
+        parsed = CombinedFeatures.model_validate(parse_llm_json(resp.text))
+    except (ValidationError, ValueError):
+        return None
+    return (
+        TradeFeatures(**parsed.trade.model_dump()),
+        PoliticalFeatures(**parsed.political.model_dump()),
+        GSCPIFeatures(**parsed.gscpi.model_dump()),
+    )
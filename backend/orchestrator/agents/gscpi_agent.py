@@ -1,26 +1,70 @@
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-from orchestrator.utils.api_clients import get_gemini
+from orchestrator.utils.api_clients import gemini_generate, parse_llm_json, http_client
+from config.settings import settings
 from ..utils.schema import GSCPIFeatures
 from ..utils.timeutils import utc_now_iso
+from ..utils.gscpi_store import GSCPIStore, parse_published
+from ..utils.cache import coalesce
 
-async def gscpi_features() -> GSCPIFeatures:
+gscpi_store = GSCPIStore(settings.gscpi_store_path, seed_path=settings.gscpi_seed_path)
+gscpi_store.load()
+
+async def fetch_latest_gscpi() -> tuple[str, float]:
+    """Ask Gemini for the latest monthly value; raises if the answer can't be parsed."""
     prompt = """
 Fetch the latest NY Fed Global Supply Chain Pressure Index (GSCPI) value (monthly).
 Return strict JSON: {"global_risk": float, "timestamp": "YYYY-MM"}.
 If you cannot fetch today, return last known recent value (e.g., 0.0 to 1.0 range).
 """
-    model = get_gemini()
+    resp = await gemini_generate(prompt)
+    data = parse_llm_json(resp.text)
+    return data.get("timestamp", utc_now_iso()[:7]), float(data["global_risk"])
+
+async def fetch_published_gscpi() -> dict[str, float]:
+    """The NY Fed's published monthly series; raises if it can't be downloaded or parsed."""
+    r = await http_client("scrape").get(settings.gscpi_history_url, follow_redirects=True)
+    r.raise_for_status()
+    series = parse_published(r.content)
+    if not series:
+        raise ValueError("no GSCPI rows in the published file")
+    return series
+
+async def fetch_gscpi() -> tuple[str, float]:
+    """
+    Latest monthly value for the store's refresher. The published series is merged whole,
+    so an empty store gets the full history in one download; Gemini is only the fallback.
+    """
     try:
-        resp = model.generate_content(prompt)
-        import json, re
-        s = (resp.text or "{}")
-        s = re.sub(r"```json|```", "", s).strip()
-        data = json.loads(s)
-        return GSCPIFeatures(
-            global_risk=float(data.get("global_risk", 0.2)),
-            timestamp=data.get("timestamp", utc_now_iso()[:7])
-        )
+        series = await fetch_published_gscpi()
     except Exception:
+        return await fetch_latest_gscpi()
+    await gscpi_store.put_many(series)
+    month = max(series)
+    return month, series[month]
+
+async def adopt_gscpi(candidate: GSCPIFeatures) -> GSCPIFeatures:
+    """Use a value obtained elsewhere (e.g. the combined LLM call) only while the store is empty."""
+    if gscpi_store.latest() is None:
+        try:
+            await gscpi_store.put(candidate.timestamp or utc_now_iso()[:7], candidate.global_risk)
+        except ValueError:
+            return candidate
+    return await gscpi_features()
+
+@coalesce("gscpi", key=lambda: "latest")
+async def gscpi_features() -> GSCPIFeatures:
+    # Served from the monthly store (refreshed in the background); only fetched inline
+    # when the store is still empty (published series first, then the LLM).
+    latest = gscpi_store.latest()
+    if latest is None:
+        try:
+            await gscpi_store.refresh(fetch_gscpi, force=True)
+            latest = gscpi_store.latest()
+        except Exception:
+            latest = None
+    if latest is None:
         return GSCPIFeatures(global_risk=0.2, timestamp=utc_now_iso()[:7])
+    month, value = latest
+    return GSCPIFeatures(global_risk=value, timestamp=month)
@@ -1,7 +1,14 @@
-from bs4 import BeautifulSoup
-from ..utils.api_clients import serp_search, http_client, get_gemini
+import asyncio
+from collections import defaultdict
+from urllib.parse import urlsplit
+from ..utils.api_clients import serp_search, http_client, gemini_generate, parse_llm_json
 from ..utils.schema import NewsFeatures
-from ..utils.cache import get_cached, set_cached, news_cache
+from ..utils.cache import get_cached, set_cached, news_cache, coalesce
+from ..utils.textextract import extract_texts
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from config.settings import settings
 
 SEARCH_TEMPLATES = [
     "{component} {seller} {loc} strike OR protest OR stoppage",
@@ -11,19 +18,79 @@ SEARCH_TEMPLATES = [
     "{seller} {loc} port congestion OR customs backlog"
 ]
 
+_serp_sem: tuple[asyncio.AbstractEventLoop, asyncio.Semaphore] | None = None
+
+def _serp_slots() -> asyncio.Semaphore:
+    # One cap for the whole process (per event loop), shared by every lane of a batch
+    global _serp_sem
+    loop = asyncio.get_running_loop()
+    if _serp_sem is None or _serp_sem[0] is not loop:
+        _serp_sem = (loop, asyncio.Semaphore(max(1, settings.serp_max_concurrency)))
+    return _serp_sem[1]
+
+async def _fetch_page(client, url: str, host_slots: dict, max_bytes: int) -> str | None:
+    async with host_slots[urlsplit(url).hostname or ""]:
+        async with client.stream("GET", url, follow_redirects=True) as r:
+            # Decide from headers alone; PDFs/images never get their body read
+            if r.status_code != 200 or "text/html" not in r.headers.get("content-type", ""):
+                return None
+            buf = bytearray()
+            async for chunk in r.aiter_bytes():
+                buf += chunk
+                if len(buf) >= max_bytes:
+                    break
+            return bytes(buf[:max_bytes]).decode(r.charset_encoding or "utf-8", errors="replace")
+
 async def _fetch_pages(urls: list[str]) -> list[str]:
+    """
+    Download pages concurrently (per-host capped), reading at most SCRAPE_MAX_BYTES
+    of each body. Whatever has finished by SCRAPE_DEADLINE_SECONDS is returned,
+    in the original URL order.
+    """
+    client = http_client("scrape")
+    host_slots = defaultdict(lambda: asyncio.Semaphore(max(1, settings.scrape_per_host_limit)))
+    tasks = [
+        asyncio.create_task(_fetch_page(client, u, host_slots, settings.scrape_max_bytes))
+        for u in urls[:settings.scrape_max_pages]
+    ]
+    if not tasks:
+        return []
+    done, pending = await asyncio.wait(tasks, timeout=settings.scrape_deadline_seconds)
+    for t in pending:
+        t.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)  # let the cancellations finish
     htmls = []
-    async with http_client() as client:
-        for u in urls[:8]:
+    for t in tasks:
+        if t in done and not t.cancelled() and t.exception() is None and t.result():
+            htmls.append(t.result())
+    return htmls
+
+async def _search_all(queries: list[str], memo: dict | None = None) -> list[dict]:
+    # Run all queries concurrently (capped); results come back in query order.
+    # `memo` (query -> task) lets a batch share identical queries across lanes.
+    slots = _serp_slots()
+
+    async def _one(q: str) -> dict:
+        async with slots:
             try:
-                r = await client.get(u, follow_redirects=True)
-                if r.status_code == 200 and "text/html" in r.headers.get("content-type", ""):
-                    htmls.append(r.text)
+                return await serp_search(q, num=6)
             except Exception:
-                continue
-    return htmls
+                return {}
 
-async def analyze_news(component_type: str, seller_loc: str, import_loc: str, seller_name: str | None) -> NewsFeatures:
+    if memo is None:
+        return await asyncio.gather(*(_one(q) for q in queries))
+    tasks = []
+    for q in queries:
+        if q not in memo:
+            memo[q] = asyncio.ensure_future(_one(q))
+        # shield: one lane timing out must not cancel a query other lanes await
+        tasks.append(asyncio.shield(memo[q]))
+    return await asyncio.gather(*tasks)
+
+@coalesce("news", key=lambda c, s, i, n, query_memo=None: f"{c}|{s}|{i}|{n or ''}")
+async def analyze_news(component_type: str, seller_loc: str, import_loc: str, seller_name: str | None,
+                       query_memo: dict | None = None) -> NewsFeatures:
     key = f"{component_type}|{seller_loc}|{import_loc}|{seller_name or ''}"
     cached = get_cached(news_cache, key)
     if cached:
@@ -35,28 +102,24 @@ async def analyze_news(component_type: str, seller_loc: str, import_loc: str, se
         queries.append(t.format(component=component_type, seller=seller_name or "", loc=import_loc))
 
     urls = []
-    for q in queries:
-        try:
-            res = await serp_search(q, num=6)
-            for item in res.get("organic_results", []):
-                link = item.get("link")
-                if link and link not in urls:
-                    urls.append(link)
-        except Exception:
-            continue
+    seen = set()
+    for res in await _search_all(queries, query_memo):
+        for item in res.get("organic_results", []):
+            link = item.get("link")
+            if link and link not in seen:
+                seen.add(link)
+                urls.append(link)
 
     htmls = await _fetch_pages(urls)
-    texts = []
-    for h in htmls:
-        try:
-            soup = BeautifulSoup(h, "lxml")
-            txt = soup.get_text(separator=" ", strip=True)
-            texts.append(txt[:5000])  # cap per page
-        except Exception:
-            continue
+    texts = await extract_texts(
+        htmls,
+        max_chars=5000,  # cap per page
+        extractor=settings.text_extractor,
+        mode=settings.text_extract_mode,
+        workers=settings.text_extract_workers,
+    )
 
     # Ask Gemini to compute our three features from texts
-    model = get_gemini()
     prompt = f"""
 You are analyzing news snippets about supply-chain disruptions. From the provided texts, compute:
 - news_vol_7d: count of distinct relevant disruption mentions in last 7 days
@@ -67,11 +130,8 @@ Texts:
 {texts[:10]}
 """
     try:
-        resp = model.generate_content(prompt)
-        import json, re
-        s = (resp.text or "{}")
-        s = re.sub(r"```json|```", "", s).strip()
-        data = json.loads(s)
+        resp = await gemini_generate(prompt)
+        data = parse_llm_json(resp.text)
         feats = NewsFeatures(
             news_vol_7d=int(data.get("news_vol_7d", 0)),
             neg_tone_frac_3d=float(data.get("neg_tone_frac_3d", 0.0)),
@@ -1,5 +1,5 @@
 from ..utils.schema import (TradeFeatures, NewsFeatures, WeatherFeatures, PoliticalFeatures, GSCPIFeatures, NormalizedFeatureVector)
-from ..utils.scoring import normalize_features
+from ..utils.scoring import normalize_features, normalize_features_batch
 
 def assemble_raw(trade: TradeFeatures, news: NewsFeatures, weather: WeatherFeatures, pol: PoliticalFeatures, g: GSCPIFeatures):
     return {
@@ -16,3 +16,8 @@ def normalize_all(ts_iso: str, trade, news, weather, pol, g) -> NormalizedFeatur
     raw = assemble_raw(trade, news, weather, pol, g)
     norm = normalize_features(raw)
     return NormalizedFeatureVector(ts_iso=ts_iso, features=norm)
+
+def normalize_all_batch(ts_iso: str, lanes: list) -> list[NormalizedFeatureVector]:
+    # lanes: [(trade, news, weather, pol, g), ...]
+    norms = normalize_features_batch([assemble_raw(*lane) for lane in lanes])
+    return [NormalizedFeatureVector(ts_iso=ts_iso, features=n) for n in norms]
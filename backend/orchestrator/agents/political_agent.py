@@ -1,9 +1,11 @@
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-from orchestrator.utils.api_clients import get_gemini
+from orchestrator.utils.api_clients import gemini_generate, parse_llm_json
 from ..utils.schema import PoliticalFeatures
+from ..utils.cache import coalesce
 
+@coalesce("political", key=lambda c, s, i, n: f"{c}|{s}|{i}|{n or ''}")
 async def political_features(component_type: str, seller_loc: str, import_loc: str, seller_name: str | None) -> PoliticalFeatures:
     prompt = f"""
 You are a geopolitics analyst. Considering semiconductor/electronics shipments for:
@@ -12,13 +14,9 @@ Assess current sanctions and political risk in the past 30 days relevant to this
 Return strict JSON: {{"sanction_flag": 0 or 1, "political_risk_score": float (0-1), "notes": "short"}}
 Be conservative; if uncertain, sanction_flag=0 and risk_score near 0.3.
 """
-    model = get_gemini()
     try:
-        resp = model.generate_content(prompt)
-        import json, re
-        s = (resp.text or "{}")
-        s = re.sub(r"```json|```", "", s).strip()
-        data = json.loads(s)
+        resp = await gemini_generate(prompt)
+        data = parse_llm_json(resp.text)
         return PoliticalFeatures(
             sanction_flag=int(data.get("sanction_flag", 0)),
             political_risk_score=float(data.get("political_risk_score", 0.3)),
@@ -1,10 +1,12 @@
 from ..utils.schema import TradeFeatures, TradeEdge
-from ..utils.api_clients import get_gemini
+from ..utils.api_clients import gemini_generate, parse_llm_json
+from ..utils.cache import coalesce
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 from config.settings import settings
 
+@coalesce("trade", key=lambda c, s, i: f"{c}|{s}|{i}")
 async def fetch_trade_features(component_type: str, seller_loc: str, import_loc: str) -> TradeFeatures:
     """
     Without a direct Comtrade API key, use Gemini to reason and approximate:
@@ -26,14 +28,9 @@ Return JSON with fields:
 }}
 Be conservative; cite month strings in last 1-2 months if possible. If unsure, provide plausible conservative values.
 """
-    model = get_gemini()
-    resp = model.generate_content(prompt)
-    data = {}
+    resp = await gemini_generate(prompt)
     try:
-        import json, re
-        txt = resp.text or "{}"
-        txt = re.sub(r"```json|```", "", txt).strip()
-        data = json.loads(txt)
+        data = parse_llm_json(resp.text)
     except Exception:
         data = {}
 
@@ -1,42 +1,123 @@
+import asyncio
+import numpy as np
+from typing import Iterable, List, Optional, Sequence, Tuple
 from ..utils.api_clients import fetch_weather
 from ..utils.schema import WeatherFeatures
+from ..utils.cache import coalesce, get_weather_near, set_weather
+from ..utils import geohash
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from config.settings import settings
+
+LatLon = Tuple[float, float]
+
+def _openweather_temps(payload: dict) -> List[float]:
+    return [d["temp"]["day"] for d in payload.get("daily", []) if "temp" in d]
+
+def _weatherapi_temps(payload: dict) -> List[float]:
+    return [d["day"]["avgtemp_c"] for d in payload.get("forecast", {}).get("forecastday", []) if "day" in d]
+
+def daily_temps(payload: dict) -> List[float]:
+    # choose by payload shape
+    try:
+        return _openweather_temps(payload) if "daily" in payload else _weatherapi_temps(payload)
+    except (KeyError, TypeError, AttributeError):
+        return []
+
+def detect_anomalies(series: Sequence[Sequence[float]], min_days: int = 5, k: float = 1.5) -> np.ndarray:
+    """
+    Toy detection for many forecast points at once: a point is anomalous if any daily temp
+    deviates > k std from its own week's mean (needs >= min_days values). Rows are padded
+    with NaN to a (points x days) matrix so everything runs in one NumPy pass.
+    """
+    if not series:
+        return np.zeros(0, dtype=int)
+    width = max((len(s) for s in series), default=0)
+    t = np.full((len(series), max(width, 1)), np.nan)
+    for i, s in enumerate(series):
+        t[i, :len(s)] = s
+    valid = ~np.isnan(t)
+    n = valid.sum(axis=1)
+    mean = np.where(valid, t, 0.0).sum(axis=1) / np.maximum(n, 1)
+    dev = np.where(valid, np.abs(t - mean[:, None]), 0.0)
+    std = np.sqrt((dev ** 2).sum(axis=1) / np.maximum(n, 1))
+    return ((n >= min_days) & (dev > k * std[:, None]).any(axis=1)).astype(int)
 
 def detect_anomaly_openweather(payload: dict) -> int:
-    # toy detection: daily temp deviation > 1.5 std of week
     try:
-        daily = payload.get("daily", [])
-        temps = [d["temp"]["day"] for d in daily if "temp" in d]
-        if len(temps) >= 5:
-            avg = sum(temps)/len(temps)
-            var = sum((t-avg)**2 for t in temps)/len(temps)
-            std = var ** 0.5
-            # if any day deviates > 1.5 std → anomaly
-            for t in temps:
-                if abs(t-avg) > 1.5*std:
-                    return 1
+        return int(detect_anomalies([_openweather_temps(payload)])[0])
     except Exception:
-        pass
-    return 0
+        return 0
 
 def detect_anomaly_weatherapi(payload: dict) -> int:
     try:
-        days = payload.get("forecast", {}).get("forecastday", [])
-        temps = [d["day"]["avgtemp_c"] for d in days if "day" in d]
-        if len(temps) >= 5:
-            avg = sum(temps)/len(temps)
-            var = sum((t-avg)**2 for t in temps)/len(temps)
-            std = var ** 0.5
-            for t in temps:
-                if abs(t-avg) > 1.5*std:
-                    return 1
+        return int(detect_anomalies([_weatherapi_temps(payload)])[0])
     except Exception:
-        pass
-    return 0
+        return 0
 
-async def weather_features(lat: float, lon: float) -> WeatherFeatures:
+@coalesce("weather", key=lambda lat, lon: geohash.encode(lat, lon, settings.weather_geohash_precision))
+async def _fetch_point(lat: float, lon: float) -> Optional[Tuple[List[float], List[str]]]:
     data = await fetch_weather(lat, lon)
     if not data:
-        return WeatherFeatures(weather_anomaly_7d=0, details={})
-    # choose detector by payload shape
-    anomaly = 1 if ("daily" in data and detect_anomaly_openweather(data)) else detect_anomaly_weatherapi(data)
-    return WeatherFeatures(weather_anomaly_7d=anomaly, details={"provider_payload_shape": list(data.keys())})
+        return None
+    return daily_temps(data), list(data.keys())
+
+async def route_weather_features(points: Iterable[LatLon]) -> WeatherFeatures:
+    """
+    Weather along a lane. Each point is served from the spatial cache when a forecast
+    within WEATHER_CACHE_RADIUS_KM is already known; the rest are fetched concurrently
+    (one call per geohash cell) and scored together in one vectorized pass.
+    The lane is anomalous if any sampled point is.
+    """
+    precision, radius = settings.weather_geohash_precision, settings.weather_cache_radius_km
+    points = list(points)
+    if not points:
+        raise ValueError("no coordinates to sample weather for")
+    feats: List[Optional[WeatherFeatures]] = [get_weather_near(lat, lon, precision, radius) for lat, lon in points]
+
+    # Misses in the same cell share one fetch
+    cells = {}
+    for i, (lat, lon) in enumerate(points):
+        if feats[i] is None:
+            cells.setdefault(geohash.encode(lat, lon, precision), []).append(i)
+    groups = list(cells.values())
+    fetched = await asyncio.gather(*(_fetch_point(*points[idx[0]]) for idx in groups), return_exceptions=True)
+
+    ok = [(idx, r) for idx, r in zip(groups, fetched) if r is not None and not isinstance(r, BaseException)]
+    flags = detect_anomalies([temps for _, (temps, _) in ok])
+    for (idx, (_, shape)), flag in zip(ok, flags):
+        f = WeatherFeatures(weather_anomaly_7d=int(flag), details={"provider_payload_shape": shape})
+        set_weather(*points[idx[0]], precision, f)
+        for j in idx:
+            feats[j] = f
+    for idx, r in zip(groups, fetched):
+        if r is None:  # provider had nothing for this point; not cached
+            for j in idx:
+                feats[j] = WeatherFeatures(weather_anomaly_7d=0, details={})
+
+    errors = [r for r in fetched if isinstance(r, BaseException)]
+    if errors and all(f is None for f in feats):
+        raise errors[0]  # nothing usable: let the scheduler report the agent as failed
+
+    known = [(p, f) for p, f in zip(points, feats) if f is not None]
+    return WeatherFeatures(
+        weather_anomaly_7d=int(any(f.weather_anomaly_7d for _, f in known)),
+        details={
+            "points_sampled": len(points),
+            "points_with_data": len(known),
+            "points_fetched": len(ok),
+            "anomalous_points": [[round(p[0], 4), round(p[1], 4)] for p, f in known if f.weather_anomaly_7d],
+        },
+    )
+
+def lane_points(seller: Optional[LatLon], importer: Optional[LatLon],
+                waypoints: Sequence[LatLon] = ()) -> List[LatLon]:
+    """Sample points for a lane: both ends, any waypoints, and WEATHER_ROUTE_SAMPLES points along the great circle."""
+    path = [tuple(p) for p in (seller, *waypoints, importer) if p is not None]
+    if seller is None or importer is None:
+        return path  # can't draw the route; sample only what we know
+    return geohash.route_points(path, settings.weather_route_samples)
+
+async def weather_features(lat: float, lon: float) -> WeatherFeatures:
+    return await route_weather_features([(lat, lon)])
@@ -0,0 +1,220 @@
+import asyncio
+import json
+import os
+import re
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Set
+from .utils.schema import Alert, AnalyzeResponse
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from config.settings import settings
+
+@dataclass
+class AlertRule:
+    """
+    `threshold`: fires when `metric` crosses `value` (>= for op ">", <= for op "<") and
+    re-arms once it moves back past `value -/+ hysteresis`, so a lane that stays high
+    alerts once. `delta`: fires when `metric` moved by at least `value` in that direction
+    since the lane's previous result.
+    Metrics: "risk_score", any normalized feature name, or "gscpi" on the global lane.
+    """
+    name: str
+    kind: str          # "threshold" | "delta"
+    metric: str
+    value: float
+    op: str = ">"      # ">" rising | "<" falling
+    severity: str = "medium"
+    type: str = "risk"
+    hysteresis: float = 0.05
+    message: str = "{metric} {verb} {value:.2f} on {lane}"
+
+DEFAULT_RULES = [
+    AlertRule("high_risk", "threshold", "risk_score", 0.70, severity="high",
+              message="Risk score {value:.2f} crossed {threshold:.2f} on {route}"),
+    AlertRule("risk_jump", "delta", "risk_score", 0.15, severity="medium",
+              message="Risk score jumped {previous:.2f} -> {value:.2f} on {route}"),
+    AlertRule("labor_unrest", "threshold", "strike_flag_7d", 0.80, severity="medium", type="labor",
+              message="Strike/labor signals elevated on {route}"),
+    AlertRule("weather_anomaly", "threshold", "weather_anomaly_7d", 0.80, severity="medium", type="weather",
+              message="Weather anomaly along {route}"),
+    AlertRule("gscpi_jump", "delta", "gscpi", 0.50, severity="medium", type="global",
+              message="GSCPI moved {previous:.2f} -> {value:.2f} ({month})"),
+]
+
+def load_rules(path: str | None) -> List[AlertRule]:
+    """Rules from a JSON list of AlertRule fields, or the defaults when no file is configured."""
+    if not path or not os.path.exists(path):
+        return list(DEFAULT_RULES)
+    with open(path, "r") as f:
+        rules = [AlertRule(**r) for r in json.load(f)]
+    for r in rules:
+        if r.kind not in ("threshold", "delta") or r.op not in (">", "<"):
+            raise ValueError(f"bad alert rule {r.name!r}: kind={r.kind!r} op={r.op!r}")
+    return rules
+
+def canonical(s: str | None) -> str:
+    return re.sub(r"\s+", " ", (s or "").strip().lower())
+
+def lane_key(inp) -> str:
+    return f"{canonical(inp.component_type)}|{canonical(inp.seller_location)}|{canonical(inp.import_location)}"
+
+@dataclass
+class _LaneState:
+    last: Dict[str, float] = field(default_factory=dict)   # metric -> previous value
+    firing: Set[str] = field(default_factory=set)          # threshold rules currently tripped
+
+class Subscriber:
+    """
+    One push client. Alerts go into a bounded queue; when the client can't keep up the
+    oldest are dropped (never blocking the producer) and `dropped` tells it to resync.
+    """
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, maxsize))
+        self.dropped = 0
+
+    def offer(self, alert: Alert):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(alert)
+
+class AlertEngine:
+    """
+    Evaluates rules incrementally: each new result is compared with a few remembered
+    values for its lane only (no history scan). Lane state is an LRU of `max_lanes`;
+    the last `keep` alerts are kept for GET polling and new subscribers.
+    """
+    def __init__(self, rules: List[AlertRule], max_lanes: int = 10000, keep: int = 200, queue_size: int = 100):
+        self.rules = rules
+        self.max_lanes = max_lanes
+        self.queue_size = queue_size
+        self.lanes: "OrderedDict[str, _LaneState]" = OrderedDict()
+        self.recent: deque = deque(maxlen=keep)
+        self.subscribers: Set[Subscriber] = set()
+        self.listeners: List[Callable[[List[Alert]], None]] = []  # called with each batch of new alerts
+        self._seq = 0
+        self._lock = threading.Lock()  # observe() may run from worker threads
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def _lane(self, key: str) -> _LaneState:
+        st = self.lanes.get(key)
+        if st is None:
+            st = self.lanes[key] = _LaneState()
+            if len(self.lanes) > self.max_lanes:
+                self.lanes.popitem(last=False)
+        else:
+            self.lanes.move_to_end(key)
+        return st
+
+    def _evaluate(self, key: str, metrics: Dict[str, float], ctx: Dict[str, str]) -> List[Alert]:
+        now = datetime.now(timezone.utc)
+        out = []
+        with self._lock:
+            st = self._lane(key)
+            for rule in self.rules:
+                v = metrics.get(rule.metric)
+                if v is None:
+                    continue
+                prev = st.last.get(rule.metric)
+                sign = 1.0 if rule.op == ">" else -1.0
+                fire = False
+                if rule.kind == "threshold":
+                    hit = sign * (v - rule.value) >= 0
+                    if hit and rule.name not in st.firing:
+                        st.firing.add(rule.name)
+                        fire = True
+                    elif not hit and sign * (v - rule.value) < -rule.hysteresis:
+                        st.firing.discard(rule.name)  # re-arm
+                elif prev is not None:
+                    fire = sign * (v - prev) >= rule.value
+                if fire:
+                    self._seq += 1
+                    fields = {"metric": rule.metric, "value": v, "previous": prev if prev is not None else float("nan"),
+                              "threshold": rule.value, "verb": "rose to" if sign > 0 else "fell to", "lane": key, **ctx}
+                    out.append(Alert(
+                        id=self._seq, rule=rule.name, type=rule.type, severity=rule.severity, lane=key,
+                        route=ctx.get("route"), component=ctx.get("component"), metric=rule.metric,
+                        value=v, previous=prev, message=_render(rule.message, fields), timestamp=now,
+                    ))
+            st.last.update(metrics)
+            self.recent.extend(out)
+        if out:
+            for fn in self.listeners:
+                fn(out)
+            self._publish(out)
+        return out
+
+    def observe(self, resp: AnalyzeResponse) -> List[Alert]:
+        inp = resp.inputs
+        metrics = {"risk_score": resp.tgn_result.risk_score, **resp.features}
+        ctx = {"route": f"{inp.seller_location} → {inp.import_location}", "component": inp.component_type}
+        return self._evaluate(lane_key(inp), metrics, ctx)
+
+    def observe_gscpi(self, month: str, value: float) -> List[Alert]:
+        """Background GSCPI refreshes are evaluated on a single "global" lane."""
+        return self._evaluate("global", {"gscpi": value}, {"route": "global", "month": month})
+
+    # ----- push -----
+    def bind_loop(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+
+    def _publish(self, alerts: List[Alert]):
+        loop = self._loop
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if loop is not None and running is not loop:
+            loop.call_soon_threadsafe(self._fan_out, alerts)  # queues are loop-bound
+        else:
+            self._fan_out(alerts)
+
+    def _fan_out(self, alerts: List[Alert]):
+        for sub in list(self.subscribers):
+            for a in alerts:
+                sub.offer(a)
+
+    def subscribe(self) -> Subscriber:
+        sub = Subscriber(self.queue_size)
+        self.subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        self.subscribers.discard(sub)
+
+    def since(self, last_id: int = 0, limit: int | None = None) -> List[Alert]:
+        with self._lock:
+            items = [a for a in self.recent if a.id > last_id]
+        return items[-limit:] if limit else items
+
+    def stats(self) -> dict:
+        return {
+            "lanes_tracked": len(self.lanes),
+            "alerts_total": self._seq,
+            "subscribers": len(self.subscribers),
+            "subscriber_drops": sum(s.dropped for s in self.subscribers),
+            "rules": [r.name for r in self.rules],
+        }
+
+class _Default(dict):
+    # str.format_map helper: unknown placeholders render as "?"
+    def __missing__(self, key):
+        return "?"
+
+def _render(template: str, fields: dict) -> str:
+    # A template that doesn't fit its fields (e.g. "{unknown:.2f}", "{value[0]}") must not
+    # lose the alert: send the raw template instead
+    try:
+        return template.format_map(_Default(fields))
+    except (ValueError, TypeError, KeyError, IndexError, AttributeError):
+        return template
+
+alert_engine = AlertEngine(
+    load_rules(settings.alert_rules_path),
+    max_lanes=settings.alert_max_lanes,
+    keep=settings.alert_recent_size,
+    queue_size=settings.alert_ws_queue_size,
+)
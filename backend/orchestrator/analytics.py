@@ -0,0 +1,138 @@
+import json
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List
+from .alerts import lane_key, canonical
+from .utils.schema import Alert, AnalyzeResponse
+from .utils.sketch import HyperLogLog
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from config.settings import settings
+
+class _Mean:
+    __slots__ = ("n", "mean")
+
+    def __init__(self):
+        self.n, self.mean = 0, 0.0
+
+    def add(self, x: float):
+        self.n += 1
+        self.mean += (x - self.mean) / self.n
+
+class OverviewAggregates:
+    """
+    Dashboard numbers kept up to date as results are produced, so reading them costs
+    the same however much history exists: counters, running means, HyperLogLog
+    distinct counts of suppliers and routes, and per-bucket risk sums / alert counts
+    for the last 2 x `window_buckets` buckets (current vs. previous window).
+    """
+    def __init__(self, bucket_seconds: float = 3600, window_buckets: int = 24, hll_precision: int = 12):
+        self.bucket_seconds = bucket_seconds
+        self.window_buckets = window_buckets
+        self.analyses = 0
+        self.degraded = 0
+        self.labels: Counter = Counter()
+        self.risk = _Mean()
+        self.agent_latency: Dict[str, _Mean] = {}
+        self.suppliers = HyperLogLog(hll_precision)
+        self.routes = HyperLogLog(hll_precision)
+        self.buckets: Dict[int, List[float]] = {}  # bucket -> [risk sum, results, alerts]
+        self.last_ts: float | None = None
+        self._lock = threading.Lock()  # the startup replay runs in a worker thread
+
+    def _bucket(self, ts: float) -> List[float] | None:
+        b = int(ts // self.bucket_seconds)
+        now = int(time.time() // self.bucket_seconds)
+        if b <= now - 2 * self.window_buckets:
+            return None  # older than both windows
+        slot = self.buckets.get(b)
+        if slot is None:
+            slot = self.buckets[b] = [0.0, 0, 0]
+            for old in [k for k in self.buckets if k <= now - 2 * self.window_buckets]:
+                del self.buckets[old]  # at most a few per new bucket
+        return slot
+
+    def _add(self, ts: float, lane: str, supplier: str, risk: float, label: str, agents: Dict[str, dict]):
+        with self._lock:
+            self.analyses += 1
+            self.labels[label] += 1
+            self.risk.add(risk)
+            self.suppliers.add(supplier)
+            self.routes.add(lane)
+            if any(a.get("status") != "ok" for a in agents.values()):
+                self.degraded += 1
+            for name, a in agents.items():
+                self.agent_latency.setdefault(name, _Mean()).add(a.get("latency_ms", 0.0))
+            slot = self._bucket(ts)
+            if slot is not None:
+                slot[0] += risk
+                slot[1] += 1
+            self.last_ts = ts if self.last_ts is None else max(self.last_ts, ts)
+
+    def observe(self, resp: AnalyzeResponse):
+        inp = resp.inputs
+        self._add(resp.created_at.timestamp(), lane_key(inp), canonical(inp.seller_name or inp.seller_location),
+                  resp.tgn_result.risk_score, resp.tgn_result.risk_label,
+                  {k: r.model_dump() for k, r in resp.agents.items()})
+
+    def observe_alerts(self, alerts: List[Alert]):
+        with self._lock:
+            for a in alerts:
+                slot = self._bucket(a.timestamp.timestamp())
+                if slot is not None:
+                    slot[2] += 1
+
+    def replay(self, rows: Iterable[tuple]):
+        """Rebuild from stored results: (ts, lane, seller_name, seller_location, risk_score, risk_label, agents JSON)."""
+        for ts, lane, name, location, risk, label, agents in rows:
+            self._add(ts, lane, canonical(name or location), risk, label, json.loads(agents))
+
+    def _window(self, index: int) -> tuple:
+        # index 0: the last `window_buckets` buckets (current one included), 1: the ones before
+        now = int(time.time() // self.bucket_seconds)
+        hi = now - index * self.window_buckets
+        risk_sum = results = alerts = 0
+        for b in range(hi - self.window_buckets + 1, hi + 1):
+            slot = self.buckets.get(b)
+            if slot:
+                risk_sum, results, alerts = risk_sum + slot[0], results + slot[1], alerts + slot[2]
+        return (risk_sum / results if results else None), results, alerts
+
+    def overview(self) -> dict:
+        with self._lock:
+            cur_mean, cur_n, cur_alerts = self._window(0)
+            prev_mean, prev_n, _ = self._window(1)
+            if cur_mean is None or prev_mean is None:
+                trend = "insufficient_data"
+            elif abs(cur_mean - prev_mean) < settings.analytics_trend_tolerance:
+                trend = "stable"
+            else:
+                trend = "increasing" if cur_mean > prev_mean else "decreasing"
+            return {
+                "total_suppliers": self.suppliers.count(),
+                "routes_seen": self.routes.count(),  # all time, not a recent window
+                "active_alerts": cur_alerts,
+                # 100 x (1 - mean risk score) over all analyses; not a delivery or reliability rate
+                "inverse_risk_score": round(100.0 * (1.0 - self.risk.mean), 1) if self.analyses else None,
+                "risk_trend": trend,
+                "last_updated": datetime.fromtimestamp(self.last_ts, timezone.utc).isoformat() if self.last_ts else None,
+                "analyses_total": self.analyses,
+                "mean_risk_score": round(self.risk.mean, 4) if self.analyses else None,
+                "risk_labels": dict(self.labels),
+                "degraded_rate": round(self.degraded / self.analyses, 4) if self.analyses else 0.0,
+                "agent_latency_ms_mean": {k: round(m.mean, 1) for k, m in self.agent_latency.items()},
+                "risk_window": {
+                    "window_seconds": self.bucket_seconds * self.window_buckets,
+                    "current": {"mean_risk_score": cur_mean, "analyses": cur_n},
+                    "previous": {"mean_risk_score": prev_mean, "analyses": prev_n},
+                },
+            }
+
+overview_stats = OverviewAggregates(
+    bucket_seconds=settings.analytics_bucket_seconds,
+    window_buckets=settings.analytics_window_buckets,
+    hll_precision=settings.analytics_hll_precision,
+)
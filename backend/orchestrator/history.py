@@ -0,0 +1,164 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import List
+from .alerts import lane_key
+from .utils.schema import AnalyzeResponse
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from config.settings import settings
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS analyses ("
+    " id INTEGER PRIMARY KEY,"
+    " request_id TEXT NOT NULL,"
+    " lane TEXT NOT NULL,"                 # lane_key(): component|seller|importer, canonical
+    " ts REAL NOT NULL,"                   # created_at, unix seconds
+    " component_type TEXT, seller_location TEXT, import_location TEXT, seller_name TEXT,"
+    " inputs TEXT NOT NULL,"               # AnalyzeRequest JSON
+    " features TEXT NOT NULL,"             # normalized feature vector JSON
+    " risk_score REAL NOT NULL, risk_label TEXT, backend TEXT,"
+    " agents TEXT NOT NULL)",              # {agent: {status, latency_ms, error}} JSON
+    "CREATE INDEX IF NOT EXISTS analyses_lane_ts ON analyses (lane, ts)",
+    "CREATE INDEX IF NOT EXISTS analyses_ts ON analyses (ts)",
+)
+_INSERT = (
+    "INSERT INTO analyses (request_id, lane, ts, component_type, seller_location, import_location, seller_name,"
+    " inputs, features, risk_score, risk_label, backend, agents) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_COLUMNS = ("request_id", "ts", "features", "risk_score", "risk_label", "backend", "agents", "inputs")
+_STOP = object()
+
+def _row(resp: AnalyzeResponse) -> tuple:
+    inp = resp.inputs
+    return (
+        resp.request_id, lane_key(inp), resp.created_at.timestamp(), inp.component_type, inp.seller_location,
+        inp.import_location, inp.seller_name, inp.model_dump_json(), json.dumps(resp.features),
+        resp.tgn_result.risk_score, resp.tgn_result.risk_label, resp.tgn_result.backend,
+        json.dumps({k: r.model_dump() for k, r in resp.agents.items()}),
+    )
+
+class ResultStore:
+    """
+    Append-only history of analysis results in SQLite (WAL). `record()` only enqueues;
+    a writer thread serializes and inserts in batches of up to `batch_size`, one
+    transaction per batch, at least every `flush_interval` seconds. If the queue is
+    full the result is dropped and counted rather than slowing the request down.
+    Reads use per-thread connections and don't block the writer.
+    """
+    def __init__(self, path: str, batch_size: int = 256, flush_interval: float = 0.5, queue_size: int = 10000):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._writer: threading.Thread | None = None
+        self._local = threading.local()
+        self.counts = {"written": 0, "batches": 0, "dropped": 0, "write_errors": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        d = os.path.dirname(self.path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")  # durable at checkpoints; a crash loses at most the last batches
+        return db
+
+    def start(self):
+        if self._writer is not None:
+            return
+        db = self._connect()
+        for stmt in _SCHEMA:
+            db.execute(stmt)
+        db.commit()
+        self._writer = threading.Thread(target=self._run, args=(db,), name="result-store-writer", daemon=True)
+        self._writer.start()
+
+    def record(self, resp: AnalyzeResponse):
+        try:
+            self._queue.put_nowait(resp)
+        except queue.Full:
+            self.counts["dropped"] += 1
+
+    def _run(self, db: sqlite3.Connection):
+        stop = False
+        while not stop:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            if _STOP in batch:
+                stop = True
+                batch = [r for r in batch if r is not _STOP]
+            if batch:
+                self._write(db, batch)
+        db.close()
+
+    def _write(self, db: sqlite3.Connection, batch: list):
+        try:
+            with db:
+                db.executemany(_INSERT, [_row(r) for r in batch])
+            self.counts["written"] += len(batch)
+            self.counts["batches"] += 1
+        except (sqlite3.Error, ValueError, TypeError):
+            self.counts["write_errors"] += len(batch)
+
+    def close(self, timeout: float = 10.0):
+        """Write what is queued and stop the writer."""
+        if self._writer is None:
+            return
+        self._queue.put(_STOP)
+        self._writer.join(timeout)
+        self._writer = None
+
+    def _reader(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA query_only=ON")
+        return db
+
+    def history(self, inp, since: float | None = None, until: float | None = None, limit: int = 100) -> List[dict]:
+        """A lane's results in [since, until] (unix seconds), newest first. Served by the (lane, ts) index."""
+        rows = self._reader().execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM analyses WHERE lane = ? AND ts >= ? AND ts <= ? ORDER BY ts DESC LIMIT ?",
+            (lane_key(inp), since if since is not None else 0.0, until if until is not None else float("inf"), limit),
+        ).fetchall()
+        out = []
+        for r in rows:
+            d = dict(zip(_COLUMNS, r))
+            d["features"], d["agents"], d["inputs"] = json.loads(d["features"]), json.loads(d["agents"]), json.loads(d["inputs"])
+            out.append(d)
+        return out
+
+    def scan(self, columns: str, until: float, chunk: int = 5000):
+        """Yield rows with ts < `until` in insertion order (startup rebuilds); own connection, fetched in chunks."""
+        if not os.path.exists(self.path):
+            return
+        db = sqlite3.connect(self.path)
+        try:
+            cur = db.execute(f"SELECT {columns} FROM analyses WHERE ts < ? ORDER BY id", (until,))
+            while True:
+                rows = cur.fetchmany(chunk)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        return {"path": self.path, "queued": self._queue.qsize(), "writer_alive": bool(self._writer and self._writer.is_alive()),
+                **self.counts}
+
+result_store = ResultStore(
+    settings.result_store_path,
+    batch_size=settings.result_store_batch_size,
+    flush_interval=settings.result_store_flush_interval_seconds,
+    queue_size=settings.result_store_queue_size,
+)
@@ -1,60 +1,320 @@
 import asyncio
+import hashlib
+import json
+import re
 import uuid
 from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Callable, Dict, List, Tuple
+import numpy as np
 from .agents.trade_agent import fetch_trade_features
 from .agents.news_agent import analyze_news
-from .agents.weather_agent import weather_features
+from .agents.weather_agent import route_weather_features, lane_points
 from .agents.political_agent import political_features
-from .agents.gscpi_agent import gscpi_features
-from .agents.normalizer_agent import normalize_all
+from .agents.gscpi_agent import gscpi_features, adopt_gscpi
+from .agents.combined_agent import combined_features
+from .agents.normalizer_agent import normalize_all, normalize_all_batch, assemble_raw
 from .agents.reporter_agent import concise_from_contrib, comprehensive, label_from_score
-from .utils.geocoding import resolve_pair
-from .utils.schema import AnalyzeRequest, AnalyzeResponse, TGNResult
+from .utils.geocoding import resolve_pair, cached_geocode
+from .utils.schema import (AnalyzeRequest, AnalyzeResponse, TGNResult, TradeFeatures, NewsFeatures,
+                           WeatherFeatures, PoliticalFeatures, GSCPIFeatures, AgentRun, BatchAnalyzeResponse)
+from .utils.timeutils import utc_now_iso
+from .utils.cache import single_flight, swr_cache, CacheEntry
+from .utils.scoring import normalize_matrix
+from .scheduler import Stage, run_dag, run_guarded, OnDone
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 from models.tgn_model import tgn
 from config.settings import settings
 
-async def run_analysis(inp: AnalyzeRequest) -> AnalyzeResponse:
-    request_id = str(uuid.uuid4())
-    now = datetime.now(timezone.utc)
+AGENT_FALLBACKS = {
+    "geocode": lambda: None,
+    "combined": lambda: None,
+    "trade": TradeFeatures,
+    "news": NewsFeatures,
+    "weather": WeatherFeatures,
+    "political": lambda: PoliticalFeatures(sanction_flag=0, political_risk_score=0.3),
+    "gscpi": lambda: GSCPIFeatures(global_risk=0.2, timestamp=utc_now_iso()[:7]),
+}
 
-    # Resolve coordinates for seller/importer (for weather)
-    (seller_latlon, importer_latlon) = await resolve_pair(inp.seller_location, inp.import_location)
-    # Fan out
-    async def _trade():   return await fetch_trade_features(inp.component_type, inp.seller_location, inp.import_location)
-    async def _news():    return await analyze_news(inp.component_type, inp.seller_location, inp.import_location, inp.seller_name)
-    async def _weather():
-        # For simplicity, consider seller location weather
-        if seller_latlon:
-            return await weather_features(*seller_latlon)
-        return await weather_features(0.0, 0.0)
-    async def _pol():     return await political_features(inp.component_type, inp.seller_location, inp.import_location, inp.seller_name)
-    async def _gscpi():   return await gscpi_features()
+def _timeout(agent: str) -> float:
+    return min(getattr(settings, f"{agent}_agent_timeout_seconds"), settings.agent_timeout_seconds)
 
-    tasks = [_trade(), _news(), _weather(), _pol(), _gscpi()]
-    trade, news, weather, pol, gscpi = await asyncio.wait_for(asyncio.gather(*tasks), timeout=settings.agent_timeout_seconds)
+def build_stages(geocode, trade, news, weather, political, gscpi, combined=None) -> list[Stage]:
+    # With a combined LLM stage, trade/political/gscpi wait for it and receive its result
+    # (None when it failed validation, in which case they make their own calls).
+    llm_deps = ("combined",) if combined is not None else ()
+    stages = [
+        Stage("geocode", geocode, timeout=_timeout("geocode"), fallback=lambda: (None, None)),
+        Stage("trade", trade, deps=llm_deps, timeout=_timeout("trade"), fallback=AGENT_FALLBACKS["trade"]),
+        Stage("news", news, timeout=_timeout("news"), fallback=AGENT_FALLBACKS["news"]),
+        Stage("weather", weather, deps=("geocode",), timeout=_timeout("weather"), fallback=AGENT_FALLBACKS["weather"]),
+        Stage("political", political, deps=llm_deps, timeout=_timeout("political"), fallback=AGENT_FALLBACKS["political"]),
+        Stage("gscpi", gscpi, deps=llm_deps, timeout=_timeout("gscpi"), fallback=AGENT_FALLBACKS["gscpi"]),
+    ]
+    if combined is not None:
+        stages.append(Stage("combined", combined, timeout=_timeout("combined"), fallback=AGENT_FALLBACKS["combined"]))
+    return stages
 
-    # Normalize + TGN
-    norm = normalize_all(now.isoformat(), trade, news, weather, pol, gscpi)
-    risk_score, contrib = tgn.predict(norm.features)
+def _build_response(inp: AnalyzeRequest, now: datetime, features: Dict[str, float],
+                    runs: Dict[str, AgentRun], prediction=None) -> AnalyzeResponse:
+    risk_score, contrib = prediction or tgn.predict(features)
     label = label_from_score(risk_score)
 
     tgn_out = TGNResult(
         risk_score=risk_score,
         risk_label=label,
-        risk_components=contrib
+        risk_components=contrib,
+        backend=tgn.backend
     )
     concise = concise_from_contrib(contrib, risk_score)
     comp = comprehensive(contrib)
 
     return AnalyzeResponse(
-        request_id=request_id,
+        request_id=str(uuid.uuid4()),
         created_at=now,
         inputs=inp,
-        features=norm.features,
+        features=features,
         tgn_result=tgn_out,
         concise=concise,
-        comprehensive=comp
+        comprehensive=comp,
+        agents=runs
+    )
+
+def request_key(inp: AnalyzeRequest) -> str:
+    """Canonical form of a request: case/whitespace-insensitive, factor order ignored."""
+    def canon(s: str | None) -> str:
+        return re.sub(r"\s+", " ", (s or "").strip().lower())
+    return "|".join([
+        canon(inp.component_type), canon(inp.seller_location), canon(inp.import_location),
+        canon(inp.seller_name), json.dumps(inp.additional_factors, sort_keys=True, default=str),
+        json.dumps(inp.waypoints),
+    ])
+
+_analysis_flight = single_flight("run_analysis")
+
+# Called with every fresh pipeline result (single, streamed and batch lanes), e.g. the alert engine.
+# Coalesced callers share one result, so it is published once.
+_result_listeners: List[Callable[[AnalyzeResponse], None]] = []
+
+def on_result(fn: Callable[[AnalyzeResponse], None]):
+    if fn not in _result_listeners:
+        _result_listeners.append(fn)
+
+def _publish(resp: AnalyzeResponse) -> AnalyzeResponse:
+    for fn in _result_listeners:
+        try:
+            fn(resp)
+        except Exception:
+            pass  # a listener must never fail the request
+    return resp
+
+async def run_analysis(inp: AnalyzeRequest) -> AnalyzeResponse:
+    # Identical concurrent requests share one pipeline run; each caller gets its own request_id
+    shared = await _analysis_flight.do(request_key(inp), lambda: _run_analysis(inp))
+    return shared.model_copy(update={"request_id": str(uuid.uuid4()), "inputs": inp})
+
+def _etag(resp: AnalyzeResponse) -> str:
+    # Weak: request_id/inputs differ per caller, the analysis itself does not
+    body = resp.model_dump_json(exclude={"request_id", "inputs"})
+    return 'W/"%s"' % hashlib.blake2b(body.encode(), digest_size=12).hexdigest()
+
+def _result_ttl(resp: AnalyzeResponse) -> float:
+    # A result built from agent defaults is worth retrying sooner
+    degraded = any(r.status != "ok" for r in resp.agents.values())
+    return settings.analyze_cache_degraded_ttl_seconds if degraded else settings.analyze_cache_ttl_seconds
+
+_analysis_cache = swr_cache(
+    "analyze_cache", ttl=settings.analyze_cache_ttl_seconds, grace=settings.analyze_cache_grace_seconds,
+    maxsize=settings.analyze_cache_size, etag=_etag, ttl_for=_result_ttl,
+)
+
+async def cached_analysis(inp: AnalyzeRequest, refresh: bool = False) -> Tuple[AnalyzeResponse, CacheEntry, str]:
+    """
+    run_analysis behind the stale-while-revalidate cache: (response, entry, "hit" | "stale" | "miss").
+    The response carries a new request_id and the caller's inputs; entry.etag/age() are
+    for the freshness headers. Misses and refreshes go through run_analysis, so they
+    are coalesced too.
+    """
+    entry, state = await _analysis_cache.get(request_key(inp), lambda: run_analysis(inp), refresh=refresh)
+    return entry.value.model_copy(update={"request_id": str(uuid.uuid4()), "inputs": inp}), entry, state
+
+async def _run_analysis(inp: AnalyzeRequest, on_done: OnDone | None = None) -> AnalyzeResponse:
+    now = datetime.now(timezone.utc)
+
+    # Each agent starts as soon as its inputs are ready; only weather needs coordinates.
+    # A slow/failing agent resolves to its default and is reported in `agents`.
+    async def _geocode():
+        return await resolve_pair(inp.seller_location, inp.import_location)
+    async def _combined():
+        return await combined_features(inp.component_type, inp.seller_location, inp.import_location, inp.seller_name)
+    async def _trade(combined=None):
+        if combined:
+            return combined[0]
+        return await fetch_trade_features(inp.component_type, inp.seller_location, inp.import_location)
+    async def _news():    return await analyze_news(inp.component_type, inp.seller_location, inp.import_location, inp.seller_name)
+    async def _weather(geocode):
+        # Sampled along the lane; with neither end geocoded there is nothing to look at
+        return await route_weather_features(lane_points(*geocode, inp.waypoints))
+    async def _pol(combined=None):
+        if combined:
+            return combined[1]
+        return await political_features(inp.component_type, inp.seller_location, inp.import_location, inp.seller_name)
+    async def _gscpi(combined=None):
+        if combined:
+            return await adopt_gscpi(combined[2])
+        return await gscpi_features()
+
+    combined = _combined if settings.llm_combined_mode else None
+    results, runs = await run_dag(build_stages(_geocode, _trade, _news, _weather, _pol, _gscpi, combined), on_done,
+                                  timeout=settings.agent_timeout_seconds)
+    trade, news, weather, pol, gscpi = (results[k] for k in ("trade", "news", "weather", "political", "gscpi"))
+
+    # Normalize + TGN
+    norm = normalize_all(now.isoformat(), trade, news, weather, pol, gscpi)
+    return _publish(_build_response(inp, now, norm.features, runs))
+
+# Normalized features each agent provides (political only feeds the report)
+FEATURE_SOURCES = {
+    "trade": ("inventory_days", "past_delay_days"),
+    "news": ("news_vol_7d", "neg_tone_frac_3d", "strike_flag_7d"),
+    "weather": ("weather_anomaly_7d",),
+    "gscpi": ("global_risk",),
+}
+
+def _partial_risk(done: Dict[str, Any]) -> Tuple[Dict[str, float], float] | None:
+    """
+    Provisional score from the agents finished so far; pending features count as neutral.
+    Normalized against the current stats without updating them.
+    """
+    keys = [k for agent, ks in FEATURE_SOURCES.items() if agent in done for k in ks]
+    if not keys:
+        return None
+    raw = assemble_raw(*(done.get(a) or AGENT_FALLBACKS[a]() for a in ("trade", "news", "weather", "political", "gscpi")))
+    norm = normalize_matrix(np.array([[raw[k] for k in keys]], dtype=float), keys)[0]
+    features = {k: float(v) for k, v in zip(keys, norm)}
+    return features, tgn.predict(features)[0]
+
+def _agent_payload(name: str, value: Any) -> Any:
+    if name == "geocode":
+        seller, importer = value or (None, None)
+        return {"seller": seller, "importer": importer}
+    if name == "combined":
+        return {"used": value is not None}
+    return value.model_dump(mode="json") if value is not None else None
+
+async def stream_analysis(inp: AnalyzeRequest, heartbeat: float = 15.0) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Run the agent DAG and yield (event, data) as it progresses: one "agent" event per
+    stage (with a provisional risk once any feature is known), then "features",
+    "tgn_result" and the full "result". "ping" is yielded after `heartbeat` idle seconds.
+    Not coalesced with other requests. Closing the generator (client disconnect)
+    cancels all upstream work still running.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    done: Dict[str, Any] = {}
+    task = asyncio.ensure_future(_run_analysis(inp, on_done=lambda n, v, r: queue.put_nowait((n, v, r))))
+    getter = None
+    try:
+        while not (task.done() and queue.empty()):
+            getter = asyncio.ensure_future(queue.get())
+            await asyncio.wait({getter, task}, timeout=heartbeat, return_when=asyncio.FIRST_COMPLETED)
+            if not getter.done():
+                getter.cancel()
+                if not task.done():
+                    yield "ping", {}
+                continue
+            name, value, run = getter.result()
+            if name != "combined":
+                done[name] = value
+            event = {"agent": name, **run.model_dump(), "data": _agent_payload(name, value),
+                     "completed": list(done)}
+            partial = _partial_risk(done)
+            if partial is not None:
+                event["partial_features"], event["partial_risk_score"] = partial
+            yield "agent", event
+        result = task.result()
+        yield "features", {"ts_iso": result.created_at.isoformat(), "features": result.features}
+        yield "tgn_result", result.tgn_result.model_dump(mode="json")
+        yield "result", result.model_dump(mode="json")
+    finally:
+        if getter is not None and not getter.done():
+            getter.cancel()
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+def _worst(*runs: AgentRun) -> AgentRun:
+    # A lane's status for a shared step is the worst of the calls it depended on
+    bad = [r for r in runs if r.status != "ok"]
+    return bad[0] if bad else max(runs, key=lambda r: r.latency_ms)
+
+async def run_batch(inps: List[AnalyzeRequest]) -> BatchAnalyzeResponse:
+    """
+    Analyze many lanes, running shared upstream work once: one GSCPI call, one geocode
+    per distinct location, one trade/political/news assessment per distinct lane, one
+    weather route per distinct set of lane coordinates (points shared through the
+    spatial cache), and SERP queries shared across lanes.
+    All lanes are then normalized together in one vectorized pass.
+    """
+    now = datetime.now(timezone.utc)
+    slots = asyncio.Semaphore(max(1, settings.batch_max_concurrency))
+    serp_memo: dict = {}
+
+    def distinct(keys):
+        return list(dict.fromkeys(keys))
+
+    async def guarded(agent: str, fn, *args):
+        async with slots:
+            return await run_guarded(fn(*args), _timeout(agent), AGENT_FALLBACKS[agent], agent)
+
+    async def fan_out(agent: str, fn, keys: list) -> dict:
+        results = await asyncio.gather(*(guarded(agent, fn, *k) for k in keys))
+        return dict(zip(keys, results))
+
+    locations = distinct((loc,) for i in inps for loc in (i.seller_location, i.import_location))
+    trade_keys = distinct((i.component_type, i.seller_location, i.import_location) for i in inps)
+    lane_keys = distinct((i.component_type, i.seller_location, i.import_location, i.seller_name) for i in inps)
+
+    async def _weather_all():
+        geo = await geo_task
+        lane_routes = [
+            tuple(lane_points(geo[(i.seller_location,)][0], geo[(i.import_location,)][0], i.waypoints)) for i in inps
+        ]
+        by_route = await fan_out("weather", lambda *pts: route_weather_features(pts), distinct(r for r in lane_routes if r))
+        return geo, lane_routes, by_route
+
+    async def _news(c, s, i, n):
+        return await analyze_news(c, s, i, n, query_memo=serp_memo)
+
+    geo_task = asyncio.ensure_future(fan_out("geocode", cached_geocode, locations))
+    gscpi_out, trade, news, pol, (geo, lane_routes, weather) = await asyncio.gather(
+        guarded("gscpi", gscpi_features),
+        fan_out("trade", fetch_trade_features, trade_keys),
+        fan_out("news", _news, lane_keys),
+        fan_out("political", political_features, lane_keys),
+        _weather_all(),
+    )
+
+    lanes, lane_runs = [], []
+    for i, route in zip(inps, lane_routes):
+        lane = (i.component_type, i.seller_location, i.import_location, i.seller_name)
+        (_, g1), (_, g2) = geo[(i.seller_location,)], geo[(i.import_location,)]
+        w = weather.get(route) if route else None
+        t, nw, p = trade[lane[:3]], news[lane], pol[lane]
+        lanes.append((t[0], nw[0], w[0] if w else AGENT_FALLBACKS["weather"](), p[0], gscpi_out[0]))
+        runs = {"geocode": _worst(g1, g2), "trade": t[1], "news": nw[1], "political": p[1], "gscpi": gscpi_out[1]}
+        # No coordinates: weather was never fetched, report it as degraded like the geocode
+        runs["weather"] = w[1] if w else runs["geocode"]
+        lane_runs.append(runs)
+
+    norms = normalize_all_batch(now.isoformat(), lanes)
+    preds = tgn.predict_batch([n.features for n in norms])  # all lanes in one pass
+    results = [_publish(_build_response(i, now, n.features, r, p)) for i, n, r, p in zip(inps, norms, lane_runs, preds)]
+    return BatchAnalyzeResponse(
+        results=results,
+        upstream_calls={
+            "geocode": len(locations), "trade": len(trade_keys), "news": len(lane_keys),
+            "political": len(lane_keys), "weather": len(weather), "gscpi": 1, "serp_queries": len(serp_memo),
+        },
     )
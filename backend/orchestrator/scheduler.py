@@ -0,0 +1,93 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Tuple
+from .utils.schema import AgentRun
+from .utils.metrics import agent_latency
+
+@dataclass
+class Stage:
+    """
+    One node of the agent DAG. `fn` is called with the results of `deps` as keyword
+    arguments as soon as they are ready. On timeout/error the stage resolves to
+    `fallback()` so dependents and the final report still get a value.
+    """
+    name: str
+    fn: Callable[..., Awaitable[Any]]
+    deps: Tuple[str, ...] = ()
+    timeout: float | None = None
+    fallback: Callable[[], Any] = lambda: None
+
+async def run_guarded(coro: Awaitable[Any], timeout: float | None, fallback: Callable[[], Any],
+                      agent: str | None = None) -> Tuple[Any, AgentRun]:
+    """Await `coro` with a deadline; on timeout/error return `fallback()` and say why. `agent` labels the latency metric."""
+    t0 = time.perf_counter()
+    try:
+        value = await asyncio.wait_for(coro, timeout=timeout)
+        run = AgentRun(status="ok", latency_ms=0.0)
+    except asyncio.TimeoutError:
+        value, run = fallback(), AgentRun(status="timeout", latency_ms=0.0)
+    except Exception as e:
+        value, run = fallback(), AgentRun(status="error", latency_ms=0.0, error=f"{type(e).__name__}: {e}"[:200])
+    elapsed = time.perf_counter() - t0
+    run.latency_ms = round(elapsed * 1000, 2)
+    if agent is not None:
+        agent_latency.labels(agent, run.status).observe(elapsed)
+    return value, run
+
+OnDone = Callable[[str, Any, AgentRun], None]
+
+async def _run_stage(stage: Stage, tasks: Dict[str, asyncio.Task], runs: Dict[str, AgentRun], on_done: OnDone | None,
+                     deadline: float | None):
+    kwargs = {d: await tasks[d] for d in stage.deps}
+    timeout = stage.timeout
+    if deadline is not None:
+        # A stage that waited on its deps only gets what is left of the overall budget
+        remaining = max(0.0, deadline - asyncio.get_running_loop().time())
+        timeout = remaining if timeout is None else min(timeout, remaining)
+    value, runs[stage.name] = await run_guarded(stage.fn(**kwargs), timeout, stage.fallback, stage.name)
+    if on_done is not None:
+        on_done(stage.name, value, runs[stage.name])
+    return value
+
+def _check_acyclic(stages: list[Stage]):
+    by_name = {s.name: s for s in stages}
+    state: Dict[str, int] = {}  # 1 = visiting, 2 = done
+
+    def visit(name: str, path: Tuple[str, ...]):
+        if name not in by_name:
+            raise ValueError(f"stage {path[-1]!r} depends on unknown stage {name!r}")
+        if state.get(name) == 2:
+            return
+        if state.get(name) == 1:
+            raise ValueError(f"dependency cycle: {' -> '.join(path + (name,))}")
+        state[name] = 1
+        for d in by_name[name].deps:
+            visit(d, path + (name,))
+        state[name] = 2
+
+    for s in stages:
+        visit(s.name, ())
+
+async def run_dag(stages: list[Stage], on_done: OnDone | None = None,
+                  timeout: float | None = None) -> Tuple[Dict[str, Any], Dict[str, AgentRun]]:
+    """
+    Run all stages, each starting when its deps finish. Returns (results, per-stage runs).
+    `on_done(name, value, run)` is called as each stage settles (for streaming progress).
+    `timeout` bounds the whole DAG: each stage's own timeout is cut to what is left of it
+    when the stage starts. Cancelling run_dag cancels every stage still running.
+    """
+    deadline = asyncio.get_running_loop().time() + timeout if timeout is not None else None
+    _check_acyclic(stages)
+    tasks: Dict[str, asyncio.Task] = {}
+    runs: Dict[str, AgentRun] = {}
+    # Every task is created before any runs, so a stage can always find its deps' tasks
+    for s in stages:
+        tasks[s.name] = asyncio.ensure_future(_run_stage(s, tasks, runs, on_done, deadline))
+    try:
+        results = await asyncio.gather(*tasks.values())
+    finally:
+        for t in tasks.values():
+            if not t.done():
+                t.cancel()
+    return dict(zip(tasks.keys(), results)), {n: runs[n] for n in tasks if n in runs}
@@ -1,5 +1,10 @@
+import asyncio
+import functools
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import httpx
-import google.generativeai as genai
 from tenacity import retry, stop_after_attempt, wait_exponential
 from ..utils.timeutils import utc_now_iso
 import sys
@@ -7,15 +12,179 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 from config.settings import settings
 
-# Configure Gemini
-genai.configure(api_key=settings.gemini_api_key)
+# google.generativeai (grpc/protobuf) costs ~1 s to import: load and configure it on
+# first use or from the app lifespan via init_gemini(), not at import time
+_genai = None
+_genai_lock = threading.Lock()
+
+def init_gemini():
+    global _genai
+    with _genai_lock:
+        if _genai is None:
+            import google.generativeai as genai
+            if not settings.gemini_api_key:
+                raise RuntimeError("GEMINI_API_KEY is not set")
+            genai.configure(api_key=settings.gemini_api_key)
+            _genai = genai
+    return _genai
 
 def get_gemini():
     # Change model if you want a different Gemini variant
-    return genai.GenerativeModel("gemini-2.0-flash")
+    return init_gemini().GenerativeModel("gemini-2.0-flash")
+
+# Bounds in-flight Gemini calls per process (native async or executor mode alike).
+# Created on first use per event loop: an asyncio.Semaphore binds to the loop that
+# first waits on it, and tests / app restarts run on new loops.
+_gemini_sem: tuple[asyncio.AbstractEventLoop, asyncio.Semaphore] | None = None
+
+def _gemini_slots() -> asyncio.Semaphore:
+    global _gemini_sem
+    loop = asyncio.get_running_loop()
+    if _gemini_sem is None or _gemini_sem[0] is not loop:
+        _gemini_sem = (loop, asyncio.Semaphore(max(1, settings.gemini_max_concurrency)))
+    return _gemini_sem[1]
+_gemini_executor: ThreadPoolExecutor | None = None
+gemini_stats = {"requests": 0, "errors": 0}  # the SDK does its own transport, so it is counted here
+
+def _executor() -> ThreadPoolExecutor:
+    global _gemini_executor
+    if _gemini_executor is None:
+        _gemini_executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.gemini_max_concurrency), thread_name_prefix="gemini"
+        )
+    return _gemini_executor
+
+async def gemini_generate(contents, **kwargs):
+    """
+    Non-blocking `generate_content`. Uses the SDK's native async API by default;
+    GEMINI_ASYNC_MODE=executor runs the sync call on a bounded thread pool instead.
+    """
+    model = get_gemini()
+    async with _gemini_slots():
+        gemini_stats["requests"] += 1
+        try:
+            if settings.gemini_async_mode.lower() == "executor":
+                loop = asyncio.get_running_loop()
+                call = functools.partial(model.generate_content, contents, **kwargs)
+                return await loop.run_in_executor(_executor(), call)
+            return await model.generate_content_async(contents, **kwargs)
+        except Exception:
+            gemini_stats["errors"] += 1
+            raise
+
+def shutdown_gemini():
+    global _gemini_executor
+    if _gemini_executor is not None:
+        _gemini_executor.shutdown(wait=False, cancel_futures=True)
+        _gemini_executor = None
+
+# Per-provider pool sizing and timeouts. Each provider gets its own keep-alive
+# pool so a burst of page scraping can't starve SERP/geocode/weather calls.
+# A provider timeout left unset (None) falls back to HTTP_TIMEOUT_SECONDS.
+PROVIDERS = {
+    "serp":    {"timeout": settings.serp_timeout_seconds,    "max_connections": 10, "max_keepalive": 10},
+    "geocode": {"timeout": settings.geocode_timeout_seconds, "max_connections": 10, "max_keepalive": 10},
+    "weather": {"timeout": settings.weather_timeout_seconds, "max_connections": 10, "max_keepalive": 10},
+    "scrape":  {"timeout": settings.scrape_timeout_seconds,  "max_connections": 32, "max_keepalive": 16},
+}
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+class _CountingTransport(httpx.AsyncHTTPTransport):
+    """Transport that counts requests and freshly opened TCP connections."""
+    def __init__(self, stats: dict, **kwargs):
+        super().__init__(**kwargs)
+        self.stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        stats = self.stats
+        stats["requests"] += 1
+        outer_trace = request.extensions.get("trace")
+
+        async def _trace(event_name: str, info: dict):
+            if event_name == "connection.connect_tcp.complete":
+                stats["connections_opened"] += 1
+            if outer_trace is not None:
+                await outer_trace(event_name, info)
+
+        request.extensions["trace"] = _trace
+        try:
+            response = await super().handle_async_request(request)
+        except Exception:
+            stats["errors"] += 1
+            raise
+        if response.status_code >= 400:
+            stats["error_responses"] += 1
+        return response
+
+class HttpPool:
+    """
+    Process-wide registry of pooled httpx clients, one per upstream provider.
+    Started/closed by the FastAPI lifespan; clients are created lazily so scripts
+    that call agents directly keep working without an app.
+    """
+    def __init__(self, providers: dict):
+        self.providers = providers
+        self.clients: dict[str, httpx.AsyncClient] = {}
+        self.transports: dict[str, _CountingTransport] = {}
+        self.counters: dict[str, dict] = {}
+
+    def _build(self, provider: str) -> httpx.AsyncClient:
+        cfg = self.providers.get(provider) or {**self.providers["scrape"], "timeout": None}
+        timeout = cfg["timeout"] if cfg["timeout"] is not None else settings.http_timeout_seconds
+        limits = httpx.Limits(
+            max_connections=cfg["max_connections"],
+            max_keepalive_connections=cfg["max_keepalive"],
+            keepalive_expiry=settings.http_keepalive_expiry_seconds,
+        )
+        http2 = settings.http2_enabled and _http2_available()
+        stats = self.counters.setdefault(provider, {"requests": 0, "connections_opened": 0, "errors": 0, "error_responses": 0})
+        # Pool limits and HTTP/2 live on the transport; the client ignores them when given one
+        transport = _CountingTransport(stats, limits=limits, http2=http2)
+        self.transports[provider] = transport
+        return httpx.AsyncClient(transport=transport, timeout=httpx.Timeout(timeout))
+
+    def client(self, provider: str) -> httpx.AsyncClient:
+        c = self.clients.get(provider)
+        if c is None or c.is_closed:
+            c = self.clients[provider] = self._build(provider)
+        return c
+
+    async def start(self):
+        for provider in self.providers:
+            self.client(provider)
 
-def http_client():
-    return httpx.AsyncClient(timeout=settings.http_timeout_seconds)
+    async def aclose(self):
+        clients, self.clients = self.clients, {}
+        self.transports = {}
+        for c in clients.values():
+            await c.aclose()
+
+    def stats(self) -> dict:
+        out = {}
+        for provider, counts in self.counters.items():
+            transport = self.transports.get(provider)
+            pool = getattr(transport, "_pool", None)
+            conns = getattr(pool, "connections", []) if pool is not None else []
+            requests = counts["requests"]
+            out[provider] = {
+                **counts,
+                "open_connections": len(conns),
+                "idle_connections": sum(1 for c in conns if c.is_idle()),
+                "reuse_rate": round(1.0 - counts["connections_opened"] / requests, 4) if requests else 0.0,
+            }
+        return out
+
+http_pool = HttpPool(PROVIDERS)
+
+def http_client(provider: str = "scrape") -> httpx.AsyncClient:
+    """Shared pooled client for `provider`. Do not close it; the app lifespan owns it."""
+    return http_pool.client(provider)
 
 @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=4))
 async def serp_search(query: str, num: int = 10) -> dict:
@@ -28,22 +197,25 @@ async def serp_search(query: str, num: int = 10) -> dict:
         "hl": "en",
         "gl": "us"
     }
-    async with http_client() as client:
-        r = await client.get(url, params=params)
-        r.raise_for_status()
-        return r.json()
+    r = await http_client("serp").get(url, params=params)
+    r.raise_for_status()
+    return r.json()
 
 async def geocode(address: str) -> tuple[float, float] | None:
     base = "https://maps.googleapis.com/maps/api/geocode/json"
     params = {"address": address, "key": settings.google_maps_api_key}
-    async with http_client() as client:
-        r = await client.get(base, params=params)
-        r.raise_for_status()
-        data = r.json()
-        if data.get("results"):
-            loc = data["results"][0]["geometry"]["location"]
-            return (loc["lat"], loc["lng"])
-    return None
+    r = await http_client("geocode").get(base, params=params)
+    r.raise_for_status()
+    data = r.json()
+    # Google answers 200 for denied/throttled/invalid requests too; only ZERO_RESULTS
+    # means the address doesn't exist, anything else must not be cached as "not found"
+    status = data.get("status")
+    if status == "ZERO_RESULTS":
+        return None
+    if status != "OK" or not data.get("results"):
+        raise RuntimeError(f"geocode failed: {status} {data.get('error_message', '')}".strip())
+    loc = data["results"][0]["geometry"]["location"]
+    return (loc["lat"], loc["lng"])
 
 async def fetch_openweather(lat: float, lon: float) -> dict | None:
     url = "https://api.openweathermap.org/data/3.0/onecall"
@@ -51,10 +223,9 @@ async def fetch_openweather(lat: float, lon: float) -> dict | None:
         "lat": lat, "lon": lon, "appid": settings.weather_api_key,
         "exclude": "minutely,hourly,alerts"
     }
-    async with http_client() as client:
-        r = await client.get(url, params=params)
-        if r.status_code == 200:
-            return r.json()
+    r = await http_client("weather").get(url, params=params)
+    if r.status_code == 200:
+        return r.json()
     return None
 
 async def fetch_weatherapi(lat: float, lon: float) -> dict | None:
@@ -63,10 +234,9 @@ async def fetch_weatherapi(lat: float, lon: float) -> dict | None:
     params = {
         "key": settings.weather_api_key, "q": f"{lat},{lon}", "days": 7, "aqi": "no", "alerts": "no"
     }
-    async with http_client() as client:
-        r = await client.get(url, params=params)
-        if r.status_code == 200:
-            return r.json()
+    r = await http_client("weather").get(url, params=params)
+    if r.status_code == 200:
+        return r.json()
     return None
 
 async def fetch_weather(lat: float, lon: float) -> dict | None:
@@ -74,25 +244,22 @@ async def fetch_weather(lat: float, lon: float) -> dict | None:
         return await fetch_weatherapi(lat, lon)
     return await fetch_openweather(lat, lon)
 
-async def gemini_structured(prompt: str) -> dict:
-    """Ask Gemini to return strict JSON. If parsing fails, return {}."""
-    model = get_gemini()
-    resp = model.generate_content(
-        [{"text": prompt}],
-        generation_config={"response_mime_type": "application/json"}
-    )
+_FENCES = re.compile(r"```json|```")
+
+def parse_llm_json(text: str | None) -> dict:
+    """Parse a JSON object from model output, tolerating ```json fences. Raises ValueError."""
+    data = json.loads(_FENCES.sub("", text or "{}").strip())
+    if not isinstance(data, dict):
+        raise ValueError("expected a JSON object")
+    return data
+
+async def gemini_structured(prompt: str, schema: dict | None = None) -> dict:
+    """Ask Gemini to return strict JSON (optionally constrained by `schema`). If parsing fails, return {}."""
+    config = {"response_mime_type": "application/json"}
+    if schema is not None:
+        config["response_schema"] = schema
+    resp = await gemini_generate([{"text": prompt}], generation_config=config)
     try:
-        import json
-        return json.loads(resp.text)
+        return parse_llm_json(resp.text)
     except Exception:
-        # Best effort: try to parse JSON-like string
-        import json, re
-        try:
-            return json.loads(resp.text)
-        except Exception:
-            try:
-                # strip code block fences
-                s = re.sub(r"```json|```", "", resp.text).strip()
-                return json.loads(s)
-            except Exception:
-                return {}
+        return {}
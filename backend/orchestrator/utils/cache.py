@@ -1,12 +1,228 @@
+import asyncio
+import functools
+import time
 from cachetools import TTLCache
-from typing import Any
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Tuple
+from . import geohash
+
+class CountingTTLCache(TTLCache):
+    """TTLCache whose get() counts hits and misses."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.hits = self.misses = 0
+
+    def get(self, key, default=None):
+        value = super().get(key, default)
+        if value is default:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
 
 # Simple in-memory cache for short-lived items (news/weather) to reduce calls
-news_cache = TTLCache(maxsize=1024, ttl=900)     # 15 min
-weather_cache = TTLCache(maxsize=2048, ttl=900)  # 15 min
+news_cache = CountingTTLCache(maxsize=1024, ttl=900)  # 15 min
+weather_cache = TTLCache(maxsize=2048, ttl=900)  # 15 min, geohash cell -> (lat, lon, features)
+_weather_lookups = {"hits": 0, "misses": 0}
 
 def get_cached(cache, key: str) -> Any | None:
     return cache.get(key)
 
 def set_cached(cache, key: str, val: Any):
     cache[key] = val
+
+def get_weather_near(lat: float, lon: float, precision: int, radius_km: float) -> Any | None:
+    """
+    Nearest cached weather entry within `radius_km`. Entries are bucketed by geohash
+    cell, so only the query cell and its 8 neighbours need to be looked at.
+    """
+    best, best_d = None, radius_km
+    for cell in geohash.neighbors(geohash.encode(lat, lon, precision)):
+        hit = weather_cache.get(cell)
+        if hit is None:
+            continue
+        d = geohash.haversine_km(lat, lon, hit[0], hit[1])
+        if d <= best_d:
+            best, best_d = hit[2], d
+    _weather_lookups["hits" if best is not None else "misses"] += 1
+    return best
+
+def set_weather(lat: float, lon: float, precision: int, val: Any):
+    weather_cache[geohash.encode(lat, lon, precision)] = (lat, lon, val)
+
+class SingleFlight:
+    """
+    Concurrent callers with the same key await one in-flight computation instead of
+    each running it (cache-stampede protection). Nothing is kept after it finishes;
+    pair it with a cache for that.
+    """
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._waiters: Dict[asyncio.Future, int] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.coalesced += 1
+        else:
+            self.executed += 1
+            fut = asyncio.ensure_future(fn())
+            self._inflight[key] = fut
+            fut.add_done_callback(lambda f, key=key: self._forget(key, f))
+        # shield: one caller giving up (timeout/disconnect) must not cancel the others;
+        # once the last one has left, nobody needs the result and the work is cancelled
+        self._waiters[fut] = self._waiters.get(fut, 0) + 1
+        try:
+            return await asyncio.shield(fut)
+        except asyncio.CancelledError:
+            if self._waiters.get(fut) == 1 and not fut.done():
+                fut.cancel()
+            raise
+        finally:
+            n = self._waiters.pop(fut, 1) - 1
+            if n > 0:
+                self._waiters[fut] = n
+
+    def _forget(self, key: str, fut: asyncio.Future):
+        if self._inflight.get(key) is fut:
+            del self._inflight[key]
+        if not fut.cancelled():
+            fut.exception()  # mark retrieved even if every waiter went away
+
+    def stats(self) -> dict:
+        total = self.executed + self.coalesced
+        return {
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+            "coalesce_rate": round(self.coalesced / total, 4) if total else 0.0,
+        }
+
+_single_flights: Dict[str, SingleFlight] = {}
+
+def single_flight(name: str) -> SingleFlight:
+    sf = _single_flights.get(name)
+    if sf is None:
+        sf = _single_flights[name] = SingleFlight(name)
+    return sf
+
+def coalesce(name: str, key: Callable[..., str]):
+    """Decorator: route calls of an async function through `single_flight(name)`."""
+    sf = single_flight(name)
+
+    def deco(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            return await sf.do(key(*args, **kwargs), lambda: fn(*args, **kwargs))
+        return wrapper
+    return deco
+
+@dataclass
+class CacheEntry:
+    value: Any
+    etag: str
+    stored: float  # time.monotonic()
+    ttl: float
+
+    def age(self) -> float:
+        return time.monotonic() - self.stored
+
+class StaleWhileRevalidate:
+    """
+    Full-result cache: an entry is served as-is for its `ttl`, then for `grace` more
+    seconds it is still served ("stale") while a single background refresh replaces
+    it. Past that it is a miss and the caller waits for `fn`. Failed refreshes keep
+    the stale entry until its grace runs out.
+    """
+    def __init__(self, name: str, ttl: float, grace: float, maxsize: int,
+                 etag: Callable[[Any], str], ttl_for: Callable[[Any], float] | None = None):
+        self.name = name
+        self.ttl = ttl
+        self.grace = grace
+        self.etag = etag
+        self.ttl_for = ttl_for  # per-value ttl (e.g. shorter for degraded results)
+        self._entries: TTLCache = TTLCache(maxsize=maxsize, ttl=max(ttl + grace, 1e-9))
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self.counts = {"hit": 0, "stale": 0, "miss": 0, "refreshes": 0, "refresh_errors": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    async def get(self, key: str, fn: Callable[[], Awaitable[Any]], refresh: bool = False) -> Tuple[CacheEntry, str]:
+        """(entry, "hit" | "stale" | "miss"). `refresh` skips the lookup but still stores the result."""
+        entry = None if refresh else self._entries.get(key)
+        if entry is not None:
+            age = entry.age()
+            if age < entry.ttl:
+                self.counts["hit"] += 1
+                return entry, "hit"
+            if age < entry.ttl + self.grace:
+                self.counts["stale"] += 1
+                self._revalidate(key, fn)
+                return entry, "stale"
+        self.counts["miss"] += 1
+        return await self._fill(key, fn), "miss"
+
+    async def _fill(self, key: str, fn: Callable[[], Awaitable[Any]]) -> CacheEntry:
+        value = await fn()
+        ttl = self.ttl if self.ttl_for is None else min(self.ttl, self.ttl_for(value))
+        entry = CacheEntry(value, self.etag(value), time.monotonic(), ttl)
+        if self.enabled:
+            self._entries[key] = entry
+        return entry
+
+    def _revalidate(self, key: str, fn: Callable[[], Awaitable[Any]]):
+        if key in self._refreshing:
+            return
+        self.counts["refreshes"] += 1
+        # Detached from the request that noticed the staleness: it already has its response
+        task = asyncio.create_task(self._fill(key, fn))
+        self._refreshing[key] = task
+        task.add_done_callback(lambda t, key=key: self._refreshed(key, t))
+
+    def _refreshed(self, key: str, task: asyncio.Task):
+        self._refreshing.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            self.counts["refresh_errors"] += 1
+
+    async def aclose(self):
+        tasks = list(self._refreshing.values())
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        served = self.counts["hit"] + self.counts["stale"] + self.counts["miss"]
+        return {
+            "size": self._entries.currsize, "maxsize": self._entries.maxsize,
+            "ttl_seconds": self.ttl, "grace_seconds": self.grace, **self.counts,
+            "refreshing": len(self._refreshing),
+            "hit_rate": round((self.counts["hit"] + self.counts["stale"]) / served, 4) if served else 0.0,
+        }
+
+_swr_caches: Dict[str, StaleWhileRevalidate] = {}
+
+def swr_cache(name: str, **kwargs) -> StaleWhileRevalidate:
+    c = _swr_caches.get(name)
+    if c is None:
+        c = _swr_caches[name] = StaleWhileRevalidate(name, **kwargs)
+    return c
+
+async def aclose_caches():
+    # Shutdown: stop background refreshes before the HTTP pools close under them
+    await asyncio.gather(*(c.aclose() for c in _swr_caches.values()))
+
+def cache_stats() -> dict:
+    return {
+        "single_flight": {name: sf.stats() for name, sf in _single_flights.items()},
+        "caches": {
+            "news_cache": {"size": news_cache.currsize, "maxsize": news_cache.maxsize,
+                           "hits": news_cache.hits, "misses": news_cache.misses},
+            "weather_cache": {"size": weather_cache.currsize, "maxsize": weather_cache.maxsize, **_weather_lookups},
+            **{name: c.stats() for name, c in _swr_caches.items()},
+        },
+    }
@@ -0,0 +1,10 @@
+import os
+
+def atomic_write(path: str, data: str):
+    """Write via temp file + fsync + rename so readers never see a partial file."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", newline="") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
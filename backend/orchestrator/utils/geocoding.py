@@ -1,6 +1,107 @@
+import asyncio
+import os
+import re
+import sqlite3
+import threading
+import time
+from cachetools import LRUCache
 from .api_clients import geocode
+from .cache import coalesce
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+from config.settings import settings
+
+_MISS = object()
+
+def normalize_address(address: str) -> str:
+    # "  Hsinchu,  Taiwan " and "hsinchu, taiwan" share one entry
+    s = re.sub(r"\s+", " ", address.strip().lower())
+    return re.sub(r"\s*,\s*", ", ", s).strip(" ,")
+
+class GeocodeCache:
+    """
+    In-memory LRU in front of a small SQLite table, so lanes stay warm across restarts.
+    Addresses that don't resolve are cached too (with a shorter TTL) as lat/lon NULL.
+    """
+    def __init__(self, path: str, maxsize: int, ttl: float, negative_ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.mem: LRUCache = LRUCache(maxsize=maxsize)  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        self.lookups = {"memory_hits": 0, "db_hits": 0, "misses": 0}
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            d = os.path.dirname(self.path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                "key TEXT PRIMARY KEY, lat REAL, lon REAL, expires_at REAL NOT NULL)"
+            )
+            db.commit()
+            self._db = db
+        return self._db
+
+    def _db_get(self, key: str):
+        # Runs in a worker thread: only touches SQLite, the caller fills `mem` on the loop
+        with self._lock:
+            return self._conn().execute(
+                "SELECT lat, lon, expires_at FROM geocode WHERE key = ?", (key,)
+            ).fetchone()
+
+    def _db_put(self, key: str, value, expires_at: float):
+        lat, lon = value if value is not None else (None, None)
+        with self._lock:
+            db = self._conn()
+            db.execute(
+                "INSERT OR REPLACE INTO geocode (key, lat, lon, expires_at) VALUES (?, ?, ?, ?)",
+                (key, lat, lon, expires_at),
+            )
+            db.commit()
+
+    async def get(self, key: str):
+        hit = self.mem.get(key)
+        if hit is not None:
+            value, expires_at = hit
+            if expires_at >= time.time():
+                self.lookups["memory_hits"] += 1
+                return value
+            self.mem.pop(key, None)
+        row = await asyncio.to_thread(self._db_get, key)
+        if row is None or row[2] < time.time():
+            self.lookups["misses"] += 1
+            return _MISS
+        self.lookups["db_hits"] += 1
+        value = (row[0], row[1]) if row[0] is not None else None
+        self.mem[key] = (value, row[2])
+        return value
+
+    async def put(self, key: str, value):
+        expires_at = time.time() + (self.ttl if value is not None else self.negative_ttl)
+        self.mem[key] = (value, expires_at)
+        await asyncio.to_thread(self._db_put, key, value, expires_at)
+
+geocode_cache = GeocodeCache(
+    settings.geocode_cache_path,
+    maxsize=settings.geocode_cache_size,
+    ttl=settings.geocode_cache_ttl_seconds,
+    negative_ttl=settings.geocode_negative_ttl_seconds,
+)
+
+@coalesce("geocode", key=normalize_address)
+async def cached_geocode(address: str) -> tuple[float, float] | None:
+    key = normalize_address(address)
+    value = await geocode_cache.get(key)
+    if value is not _MISS:
+        return value
+    value = await geocode(address)  # None only for ZERO_RESULTS; provider errors raise and are not cached
+    await geocode_cache.put(key, value)
+    return value
 
 async def resolve_pair(seller_location: str, import_location: str):
-    seller = await geocode(seller_location)
-    importer = await geocode(import_location)
+    seller, importer = await asyncio.gather(cached_geocode(seller_location), cached_geocode(import_location))
     return seller, importer
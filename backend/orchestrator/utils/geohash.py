@@ -0,0 +1,96 @@
+import math
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE = {c: i for i, c in enumerate(_BASE32)}
+
+def encode(lat: float, lon: float, precision: int = 5) -> str:
+    lat_lo, lat_hi, lon_lo, lon_hi = -90.0, 90.0, -180.0, 180.0
+    out, bits, ch, even = [], 0, 0, True
+    while len(out) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if lon >= mid:
+                ch, lon_lo = (ch << 1) | 1, mid
+            else:
+                ch, lon_hi = ch << 1, mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch, lat_lo = (ch << 1) | 1, mid
+            else:
+                ch, lat_hi = ch << 1, mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            out.append(_BASE32[ch])
+            bits, ch = 0, 0
+    return "".join(out)
+
+def decode(gh: str) -> tuple[float, float, float, float]:
+    """Returns (lat, lon, lat_err, lon_err) for the cell centre."""
+    lat_lo, lat_hi, lon_lo, lon_hi = -90.0, 90.0, -180.0, 180.0
+    even = True
+    for c in gh:
+        v = _DECODE[c]
+        for shift in range(4, -1, -1):
+            bit = (v >> shift) & 1
+            if even:
+                mid = (lon_lo + lon_hi) / 2
+                lon_lo, lon_hi = (mid, lon_hi) if bit else (lon_lo, mid)
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                lat_lo, lat_hi = (mid, lat_hi) if bit else (lat_lo, mid)
+            even = not even
+    return (lat_lo + lat_hi) / 2, (lon_lo + lon_hi) / 2, (lat_hi - lat_lo) / 2, (lon_hi - lon_lo) / 2
+
+def neighbors(gh: str) -> list[str]:
+    """The cell itself plus its (up to) 8 surrounding cells."""
+    lat, lon, dlat, dlon = decode(gh)
+    out = []
+    for i in (-1, 0, 1):
+        for j in (-1, 0, 1):
+            nlat = lat + 2 * dlat * i
+            if not -90.0 <= nlat <= 90.0:
+                continue
+            nlon = (lon + 2 * dlon * j + 180.0) % 360.0 - 180.0
+            cell = encode(nlat, nlon, len(gh))
+            if cell not in out:
+                out.append(cell)
+    return out
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * 6371.0088 * math.asin(math.sqrt(min(1.0, a)))
+
+def _interpolate(lat1: float, lon1: float, lat2: float, lon2: float, f: float) -> tuple[float, float]:
+    """Point at fraction `f` of the great-circle arc between two points."""
+    p1, l1, p2, l2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    d = haversine_km(lat1, lon1, lat2, lon2) / 6371.0088
+    if d < 1e-12:
+        return lat1, lon1
+    a, b = math.sin((1 - f) * d) / math.sin(d), math.sin(f * d) / math.sin(d)
+    x = a * math.cos(p1) * math.cos(l1) + b * math.cos(p2) * math.cos(l2)
+    y = a * math.cos(p1) * math.sin(l1) + b * math.cos(p2) * math.sin(l2)
+    z = a * math.sin(p1) + b * math.sin(p2)
+    return math.degrees(math.atan2(z, math.hypot(x, y))), math.degrees(math.atan2(y, x))
+
+def route_points(path: list[tuple[float, float]], samples: int) -> list[tuple[float, float]]:
+    """
+    The path's own vertices plus `samples` extra points spaced evenly (by great-circle
+    distance) along it. `path` is [start, *waypoints, end].
+    """
+    if len(path) < 2 or samples <= 0:
+        return list(path)
+    legs = [haversine_km(*a, *b) for a, b in zip(path, path[1:])]
+    total = sum(legs)
+    if total <= 0:
+        return list(path)
+    out, start = [path[0]], 0.0
+    targets = [total * k / (samples + 1) for k in range(1, samples + 1)]
+    for (a, b), leg in zip(zip(path, path[1:]), legs):
+        out.extend(_interpolate(*a, *b, (t - start) / leg) for t in targets if leg > 0 and start < t < start + leg)
+        out.append(b)
+        start += leg
+    return out
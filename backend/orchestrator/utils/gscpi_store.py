@@ -0,0 +1,180 @@
+import asyncio
+import csv
+import io
+import os
+import threading
+import zipfile
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from xml.etree import ElementTree
+from .fileutils import atomic_write
+
+def previous_month(now: datetime | None = None) -> str:
+    now = now or datetime.now(timezone.utc)
+    y, m = (now.year, now.month - 1) if now.month > 1 else (now.year - 1, 12)
+    return f"{y:04d}-{m:02d}"
+
+_XLSX_NS = {"m": "http://schemas.openxmlformats.org/spreadsheetml/2006/main",
+            "r": "http://schemas.openxmlformats.org/officeDocument/2006/relationships",
+            "rel": "http://schemas.openxmlformats.org/package/2006/relationships"}
+_DATE_FORMATS = ("%d-%b-%Y", "%Y-%m-%d", "%m/%d/%Y", "%Y-%m", "%b %Y")
+
+def _month_of(cell) -> str:
+    # Excel date serial (1900 system) or a date string -> "YYYY-MM"; ValueError otherwise
+    try:
+        return (datetime(1899, 12, 30) + timedelta(days=float(cell))).strftime("%Y-%m")
+    except (TypeError, ValueError, OverflowError):
+        pass
+    text = str(cell).strip()
+    for candidate in (text, text.split(" ")[0].split("T")[0]):
+        for fmt in _DATE_FORMATS:
+            try:
+                return datetime.strptime(candidate, fmt).strftime("%Y-%m")
+            except ValueError:
+                continue
+    raise ValueError(f"not a date: {text!r}")
+
+def _xlsx_rows(data: bytes) -> List[List[str]]:
+    """Cell values of the monthly-data sheet (or the first one), as strings, without openpyxl."""
+    with zipfile.ZipFile(io.BytesIO(data)) as z:
+        shared = []
+        if "xl/sharedStrings.xml" in z.namelist():
+            for si in ElementTree.fromstring(z.read("xl/sharedStrings.xml")).findall("m:si", _XLSX_NS):
+                shared.append("".join(t.text or "" for t in si.iter(f"{{{_XLSX_NS['m']}}}t")))
+        sheets = ElementTree.fromstring(z.read("xl/workbook.xml")).findall("m:sheets/m:sheet", _XLSX_NS)
+        rels = {r.get("Id"): r.get("Target") for r in
+                ElementTree.fromstring(z.read("xl/_rels/workbook.xml.rels")).findall("rel:Relationship", _XLSX_NS)}
+        sheet = next((s for s in sheets if "monthly" in (s.get("name") or "").lower()), sheets[0])
+        target = rels[sheet.get(f"{{{_XLSX_NS['r']}}}id")].lstrip("/")
+        root = ElementTree.fromstring(z.read(target if target.startswith("xl/") else f"xl/{target}"))
+    rows = []
+    for row in root.iter(f"{{{_XLSX_NS['m']}}}row"):
+        values = []
+        for c in row.findall("m:c", _XLSX_NS):
+            v = c.find("m:v", _XLSX_NS)
+            text = v.text if v is not None else "".join(t.text or "" for t in c.iter(f"{{{_XLSX_NS['m']}}}t"))
+            values.append(shared[int(text)] if c.get("t") == "s" and text else (text or ""))
+        rows.append(values)
+    return rows
+
+def parse_published(data: bytes) -> Dict[str, float]:
+    """
+    The NY Fed's published GSCPI file (XLSX, or CSV with date,value columns) ->
+    {"YYYY-MM": value}. Header and note rows are skipped.
+    """
+    if data[:2] == b"PK":
+        rows = _xlsx_rows(data)
+    else:
+        rows = list(csv.reader(io.StringIO(data.decode("utf-8-sig", errors="replace"))))
+    out = {}
+    for row in rows:
+        if len(row) < 2:
+            continue
+        try:
+            out[_month_of(row[0])] = float(row[1])
+        except (ValueError, TypeError):
+            continue
+    return out
+
+class GSCPIStore:
+    """
+    Monthly GSCPI time series kept in memory (month "YYYY-MM" -> value).
+    Seeded from `seed_path`, persisted to `path` (both CSV: month,value); the
+    latest point is cached so request-time reads are O(1).
+    """
+    def __init__(self, path: str, seed_path: str | None = None):
+        self.path = path
+        self.seed_path = seed_path
+        self.series: dict[str, float] = {}
+        self._months: List[str] = []  # sorted keys
+        self._latest: Optional[Tuple[str, float]] = None
+        self._lock = threading.Lock()
+        self.listeners: List[Callable[[str, float], None]] = []  # called with (month, value) after each put
+
+    @staticmethod
+    def _read_csv(path: str) -> dict[str, float]:
+        out = {}
+        if not path or not os.path.exists(path):
+            return out
+        with open(path, "r", newline="") as f:
+            for row in csv.DictReader(f):
+                try:
+                    month = row["month"].strip()[:7]
+                    datetime.strptime(month, "%Y-%m")
+                    out[month] = float(row["value"])
+                except (KeyError, ValueError, TypeError, AttributeError):
+                    continue
+        return out
+
+    def _reindex(self):
+        self._months = sorted(self.series)
+        self._latest = (self._months[-1], self.series[self._months[-1]]) if self._months else None
+
+    def load(self):
+        series = self._read_csv(self.seed_path)
+        series.update(self._read_csv(self.path))  # refreshed values win over the seed
+        with self._lock:
+            self.series = series
+            self._reindex()
+
+    def latest(self) -> Optional[Tuple[str, float]]:
+        return self._latest
+
+    def history(self, months: int | None = None) -> List[Tuple[str, float]]:
+        keys = self._months if months is None else self._months[-months:]
+        return [(k, self.series[k]) for k in keys]
+
+    def _persist(self):
+        buf = io.StringIO()
+        w = csv.writer(buf)
+        w.writerow(["month", "value"])
+        with self._lock:
+            rows = [(k, self.series[k]) for k in self._months]
+        w.writerows(rows)
+        d = os.path.dirname(self.path)
+        if d:
+            os.makedirs(d, exist_ok=True)
+        atomic_write(self.path, buf.getvalue())
+
+    async def put_many(self, series: Dict[str, float]):
+        """Merge a history (e.g. the published series) and persist once; listeners aren't called."""
+        with self._lock:
+            self.series.update(series)
+            self._reindex()
+        await asyncio.to_thread(self._persist)
+
+    async def put(self, month: str, value: float):
+        month = month[:7]
+        datetime.strptime(month, "%Y-%m")
+        with self._lock:
+            self.series[month] = float(value)
+            self._reindex()
+        await asyncio.to_thread(self._persist)
+        for fn in self.listeners:
+            try:
+                fn(month, float(value))
+            except Exception:
+                pass
+
+    def is_stale(self, now: datetime | None = None) -> bool:
+        # The index for month M is published early in month M+1
+        latest = self._latest
+        return latest is None or latest[0] < previous_month(now)
+
+    async def refresh(self, fetch: Callable[[], Awaitable[Tuple[str, float]]], force: bool = False) -> bool:
+        if not force and not self.is_stale():
+            return False
+        month, value = await fetch()
+        await self.put(month, value)
+        return True
+
+    async def run_refresher(self, fetch: Callable[[], Awaitable[Tuple[str, float]]], interval: float):
+        """Background task: check every `interval` seconds, fetch only when a newer month is due."""
+        while True:
+            try:
+                await self.refresh(fetch)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass  # keep serving the stored series; retry next interval
+            await asyncio.sleep(interval)
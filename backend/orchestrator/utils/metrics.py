@@ -0,0 +1,185 @@
+import asyncio
+import math
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Minimal Prometheus-compatible metrics. Hot-path updates are a dict lookup plus an
+# int/float add on the event loop (no locks, no label validation); anything that is
+# already counted elsewhere (HTTP pools, caches, stores) is read at scrape time by a
+# collector instead of being counted twice. Rendered in text exposition format 0.0.4.
+
+Sample = Tuple[str, Dict[str, str], float]  # (name suffix, labels, value)
+
+def _fmt_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    esc = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, esc)) + "}"
+
+def _fmt_value(v: float) -> str:
+    if v == math.inf:
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._children: Dict[tuple, object] = {}
+        REGISTRY.append(self)
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._child()
+        return child
+
+    def samples(self) -> Iterable[Sample]:
+        for values, child in list(self._children.items()):
+            yield from child.samples(dict(zip(self.labelnames, values)))
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, n: float = 1):
+        self.value += n
+
+    def dec(self, n: float = 1):
+        self.value -= n
+
+    def set(self, v: float):
+        self.value = v
+
+    def samples(self, labels):
+        yield "", labels, self.value
+
+class Counter(_Metric):
+    type = "counter"  # name it "..._total"
+    _child = _Value
+
+    def inc(self, n: float = 1):
+        self.labels().inc(n)
+
+class Gauge(_Metric):
+    type = "gauge"
+    _child = _Value
+
+    def inc(self, n: float = 1):
+        self.labels().inc(n)
+
+    def dec(self, n: float = 1):
+        self.labels().dec(n)
+
+    def set(self, v: float):
+        self.labels().set(v)
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # per bucket, last one is +Inf; cumulated when scraped
+        self.sum = 0.0
+
+    def observe(self, v: float):
+        self.counts[bisect_left(self.bounds, v)] += 1
+        self.sum += v
+
+    def samples(self, labels):
+        acc = 0
+        for le, n in zip(self.bounds + (math.inf,), self.counts):
+            acc += n
+            yield "_bucket", {**labels, "le": _fmt_value(le)}, acc
+        yield "_sum", labels, self.sum
+        yield "_count", labels, acc
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = ()):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames)
+
+    def _child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, v: float):
+        self.labels().observe(v)
+
+class Collector:
+    """Metric family read at scrape time: `fn()` returns [(labels, value), ...]."""
+    def __init__(self, name: str, type: str, help: str, fn: Callable[[], List[Tuple[Dict[str, str], float]]]):
+        self.name, self.type, self.help, self.fn = name, type, help, fn
+        REGISTRY.append(self)
+
+    def samples(self) -> Iterable[Sample]:
+        for labels, v in self.fn():
+            yield "", labels, v
+
+REGISTRY: List[object] = []
+
+def render() -> str:
+    lines = []
+    for m in REGISTRY:
+        try:
+            samples = list(m.samples())
+        except Exception:
+            continue  # a broken collector must not take the endpoint down
+        lines.append(f"# HELP {m.name} {m.help}")
+        lines.append(f"# TYPE {m.name} {m.type}")
+        for suffix, labels, v in samples:
+            lines.append(f"{m.name}{suffix}{_fmt_labels(labels)} {_fmt_value(v)}")
+    return "\n".join(lines) + "\n"
+
+# ----- Hot-path metrics -----
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+agent_latency = Histogram(
+    "lamda_agent_latency_seconds", "Agent call latency, including timeouts and errors (status label).",
+    ("agent", "status"), LATENCY_BUCKETS,
+)
+analyze_fallbacks = Counter("lamda_analyze_mock_fallback_total", "/analyze requests answered with the mock response after an error.")
+http_in_flight = Gauge("lamda_http_requests_in_flight", "HTTP requests being handled (streams count until closed).")
+http_requests = Counter("lamda_http_requests_total", "Completed HTTP requests by status class.", ("status",))
+loop_lag = Histogram(
+    "lamda_event_loop_lag_seconds", "How late the event loop woke a periodic timer.", (),
+    (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+class InFlightMiddleware:
+    """ASGI middleware: in-flight gauge and completed count per status class (HTTP only)."""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status = [500]
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        gauge = http_in_flight.labels()
+        gauge.inc()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            gauge.dec()
+            http_requests.labels(f"{status[0] // 100}xx").inc()
+
+async def run_loop_lag_monitor(interval: float):
+    """Background task: sleep `interval` and record how much later than that the loop resumed."""
+    child = loop_lag.labels()
+    while True:
+        t = time.perf_counter()
+        await asyncio.sleep(interval)
+        child.observe(max(0.0, time.perf_counter() - t - interval))
@@ -1,6 +1,6 @@
 from __future__ import annotations
 from pydantic import BaseModel, Field
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
 from datetime import datetime
 
 # ----- Request -----
@@ -10,6 +10,7 @@ class AnalyzeRequest(BaseModel):
     import_location: str
     seller_name: Optional[str] = None
     additional_factors: Dict[str, Any] = Field(default_factory=dict)
+    waypoints: List[Tuple[float, float]] = Field(default_factory=list)  # optional (lat, lon) ports along the lane
 
 # ----- Agent outputs (intermediate) -----
 class TradeEdge(BaseModel):
@@ -51,6 +52,13 @@ class TGNResult(BaseModel):
     risk_score: float
     risk_label: str  # "Low" | "Medium" | "High"
     risk_components: Dict[str, float]  # contribution per factor
+    backend: Optional[str] = None  # scorer that produced risk_score; "weighted_blend" (the only one for now)
+
+# ----- Per-agent execution status -----
+class AgentRun(BaseModel):
+    status: str      # "ok" | "timeout" | "error" (non-ok means the default value was used)
+    latency_ms: float
+    error: Optional[str] = None
 
 # ----- Final report (formatted) -----
 class RiskFactorReport(BaseModel):
@@ -71,3 +79,27 @@ class AnalyzeResponse(BaseModel):
     tgn_result: TGNResult
     concise: List[RiskFactorReport]
     comprehensive: ComprehensiveReport
+    agents: Dict[str, AgentRun] = Field(default_factory=dict)  # which agents degraded to defaults
+
+# ----- Alerts -----
+class Alert(BaseModel):
+    id: int                     # increasing per process; clients resume with ?since=<id>
+    rule: str
+    type: str                   # "risk" | "labor" | "weather" | "global" | ...
+    severity: str               # "high" | "medium" | "low"
+    lane: str
+    route: Optional[str] = None
+    component: Optional[str] = None
+    metric: str
+    value: float
+    previous: Optional[float] = None
+    message: str
+    timestamp: datetime
+
+# ----- Batch -----
+class BatchAnalyzeRequest(BaseModel):
+    requests: List[AnalyzeRequest]
+
+class BatchAnalyzeResponse(BaseModel):
+    results: List[AnalyzeResponse]          # same order as the request list
+    upstream_calls: Dict[str, int]          # distinct upstream work items actually run
@@ -1,12 +1,25 @@
+import asyncio
+import glob
 import json
+import logging
 import math
 import os
-from typing import Dict
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+from .fileutils import atomic_write
 import sys
-import os
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, run a single worker
+    fcntl = None
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 from config.settings import settings
 
+logger = logging.getLogger(__name__)
+
 DEFAULT_WEIGHTS = {
     "inventory_days": 0.20,
     "past_delay_days": 0.20,
@@ -17,39 +30,288 @@ DEFAULT_WEIGHTS = {
     "global_risk": 0.05
 }
 
+@contextmanager
+def _file_lock(path: str, blocking: bool = True):
+    """Exclusive flock on `path`; yields False if non-blocking and already held elsewhere."""
+    f = open(path, "a")
+    try:
+        if fcntl is None:
+            yield True
+            return
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+    finally:
+        f.close()
+
+_EMPTY = {"count": 0.0, "mean": 0.0, "M2": 0.0}
+
+def _log_flush_error(fut: asyncio.Future):
+    if not fut.cancelled() and fut.exception() is not None:
+        logger.warning("Scoring state flush failed (retried on the next one): %r", fut.exception())
+
+def _welford(state: Dict[str, Dict[str, float]], features: Dict[str, float]):
+    for k, v in features.items():
+        if v is None:
+            continue
+        s = state.get(k, _EMPTY)
+        c = s["count"] + 1.0
+        delta = v - s["mean"]
+        mean = s["mean"] + delta / c
+        M2 = s["M2"] + delta * (v - mean)
+        state[k] = {"count": c, "mean": mean, "M2": M2}
+
+def merge_moments(a: Dict[str, float], b: Dict[str, float]) -> Dict[str, float]:
+    """Chan et al. parallel merge of two (count, mean, M2) accumulators."""
+    na, nb = a["count"], b["count"]
+    if nb == 0:
+        return dict(a)
+    if na == 0:
+        return dict(b)
+    n = na + nb
+    d = b["mean"] - a["mean"]
+    return {"count": n, "mean": a["mean"] + d * nb / n, "M2": a["M2"] + b["M2"] + d * d * na * nb / n}
+
+def merge_states(a: Dict[str, Dict[str, float]], b: Dict[str, Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    return {k: merge_moments(a.get(k, _EMPTY), b.get(k, _EMPTY)) for k in a.keys() | b.keys()}
+
+def _read_snapshot(path: str) -> Tuple[Dict[str, Dict[str, float]], Dict[str, int]]:
+    """Returns (shared state, {worker_id: last merged journal seq})."""
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (ValueError, OSError):
+        return {}, {}
+    if "state" in data and "workers" in data:
+        return data["state"], data["workers"]
+    if "state" in data and "seq" in data:
+        return data["state"], {"": int(data["seq"])}  # single-writer snapshot + <path>.journal
+    return data, {}  # legacy flat snapshot
+
+def _read_journal(path: str):
+    try:
+        with open(path, "r") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # torn final line
+    except OSError:
+        return
+
 class ScoringState:
     """
     Keeps rolling mean/var per feature to z-score then squashes to [0,1].
-    Ensures run-to-run relative comparability.
+    Ensures run-to-run relative comparability, also across uvicorn workers.
+
+    Each worker accumulates its own Welford (count, mean, M2) delta and appends every
+    update to its own journal. A flush takes `<path>.lock`, merges the delta into the
+    shared snapshot with the parallel-merge formula and writes it atomically (temp file
+    + rename), off the event loop. A worker holds a lock on `<journal>.alive` while it
+    runs; on load, journals whose owner is gone are merged in, so a crash loses nothing
+    that reached a journal.
     """
-    def __init__(self, path: str):
+    def __init__(self, path: str, flush_every: int = 50):
         self.path = path
-        self.state: Dict[str, Dict[str, float]] = {}  # {feature: {count, mean, M2}}
+        self.lock_path = path + ".lock"
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.journal_path = f"{path}.journal.{self.worker_id}"
+        self.flush_every = max(1, flush_every)
+        self.state: Dict[str, Dict[str, float]] = {}  # shared snapshot merged with our delta
+        self.delta: Dict[str, Dict[str, float]] = {}  # our updates not yet merged
+        self.seq = 0                # number of updates applied by this worker
+        self._merged_seq = 0        # seq already merged into the snapshot
+        self._tail: List[str] = []  # journal lines written since the last merge
+        self._journal = None
+        self._alive = None
+        self._lock = threading.Lock()        # guards state/delta/seq/journal
+        self._flush_lock = threading.Lock()  # one merge at a time per worker
+        self._flush_scheduled = False
 
     def load(self):
-        if os.path.exists(self.path):
-            with open(self.path, "r") as f:
-                self.state = json.load(f)
-        else:
-            os.makedirs(os.path.dirname(self.path), exist_ok=True)
-            self.state = {}
-            self.save()
-
-    def save(self):
-        with open(self.path, "w") as f:
-            json.dump(self.state, f)
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            d = os.path.dirname(self.path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            with _file_lock(self.lock_path):
+                shared, workers = _read_snapshot(self.path)
+                shared, adopted = self._adopt_orphans(shared, workers)
+                if adopted:
+                    atomic_write(self.path, json.dumps({"state": shared, "workers": workers}))
+                    for jp in adopted:
+                        for f in (jp, jp + ".alive"):
+                            try:
+                                os.remove(f)
+                            except OSError:
+                                pass
+            self.state, self.delta = shared, {}
+            self.seq = self._merged_seq = 0
+            self._tail = []
 
-    def update(self, features: Dict[str, float]):
-        for k, v in features.items():
-            if v is None:
+    def _adopt_orphans(self, shared, workers):
+        # Merge journals of workers that are no longer running (their .alive lock is free)
+        prefix = self.path + ".journal"
+        adopted = []
+        for jp in sorted(glob.glob(glob.escape(prefix) + "*")):
+            if jp == self.journal_path or jp.endswith(".tmp"):
+                continue
+            if jp.endswith(".alive"):
+                if not os.path.exists(jp[:-len(".alive")]):
+                    with _file_lock(jp, blocking=False) as free:
+                        if free:
+                            os.remove(jp)  # owner exited before writing a journal
                 continue
-            s = self.state.get(k, {"count": 0.0, "mean": 0.0, "M2": 0.0})
-            c = s["count"] + 1.0
-            delta = v - s["mean"]
-            mean = s["mean"] + delta / c
-            M2 = s["M2"] + delta * (v - mean)
-            self.state[k] = {"count": c, "mean": mean, "M2": M2}
-        self.save()
+            wid = jp[len(prefix):].lstrip(".")
+            with _file_lock(jp + ".alive", blocking=False) as free:
+                if not free:
+                    continue
+                orphan: Dict[str, Dict[str, float]] = {}
+                for rec in _read_journal(jp):
+                    if rec["seq"] > workers.get(wid, 0):
+                        _welford(orphan, rec["f"])
+                shared = merge_states(shared, orphan)
+                workers.pop(wid, None)
+                adopted.append(jp)
+        return shared, adopted
+
+    def _mark_alive(self):
+        # Held for the life of the process; must exist before our journal does
+        if self._alive is None:
+            self._alive = open(self.journal_path + ".alive", "a")
+            if fcntl is not None:
+                fcntl.flock(self._alive, fcntl.LOCK_EX)
+
+    def _write_journal_tmp(self, lines: List[str]) -> str:
+        # The slow part of a journal rewrite (write + fsync), done without holding _lock
+        tmp = self.journal_path + ".tmp"
+        with open(tmp, "w", newline="") as f:
+            f.write("".join(lines))
+            f.flush()
+            os.fsync(f.fileno())
+        return tmp
+
+    def _swap_journal(self, tmp: str, extra: List[str]):
+        # Under _lock: add the lines appended while `tmp` was written, rename it into
+        # place and keep it open for appends
+        self._mark_alive()
+        if extra:
+            with open(tmp, "a") as f:
+                f.write("".join(extra))
+        if self._journal is not None:
+            self._journal.close()
+        os.replace(tmp, self.journal_path)
+        self._journal = open(self.journal_path, "a")
+
+    def update(self, features: Dict[str, float]):
+        self.update_many([features])
+
+    def update_many(self, rows: List[Dict[str, float]]):
+        # One lock acquisition and one journal write for the whole batch
+        with self._lock:
+            lines = []
+            for features in rows:
+                _welford(self.state, features)
+                _welford(self.delta, features)
+                self.seq += 1
+                lines.append(json.dumps({"seq": self.seq, "f": features}) + "\n")
+            if self._journal is None:
+                self._mark_alive()
+                self._journal = open(self.journal_path, "a")
+            self._journal.write("".join(lines))
+            self._journal.flush()
+            self._tail.extend(lines)
+            due = self.seq - self._merged_seq >= self.flush_every and not self._flush_scheduled
+            if due:
+                self._flush_scheduled = True
+        if due:
+            self._schedule_flush()
+
+    def _schedule_flush(self):
+        try:
+            fut = asyncio.get_running_loop().run_in_executor(None, self.flush)
+        except RuntimeError:
+            self.flush()  # no event loop (scripts): flush inline
+            return
+        fut.add_done_callback(_log_flush_error)
+
+    @property
+    def dirty(self) -> bool:
+        return self.seq != self._merged_seq
+
+    def flush(self):
+        """
+        Merge our delta into the shared snapshot and pick up other workers' merges.
+        Safe to call from any thread.
+        """
+        with self._flush_lock:
+            with self._lock:
+                self._flush_scheduled = False
+                seq, delta, covered = self.seq, self.delta, len(self._tail)
+                self.delta = {}
+            try:
+                with _file_lock(self.lock_path):
+                    shared, workers = _read_snapshot(self.path)
+                    if seq != self._merged_seq:
+                        shared = merge_states(shared, delta)
+                        workers[self.worker_id] = seq
+                        atomic_write(self.path, json.dumps({"state": shared, "workers": workers}))
+            except Exception:
+                with self._lock:
+                    self.delta = merge_states(delta, self.delta)
+                raise
+            with self._lock:
+                self._merged_seq = seq
+                self.state = merge_states(shared, self.delta)
+                keep, seen = self._tail[covered:], len(self._tail)
+            if covered:
+                # Drop the merged lines from the journal; update_many keeps appending meanwhile
+                tmp = self._write_journal_tmp(keep)
+                with self._lock:
+                    self._swap_journal(tmp, self._tail[seen:])
+                    self._tail = self._tail[covered:]
+
+    # Kept for callers that persisted explicitly
+    save = flush
+
+    def close(self):
+        """Final merge on shutdown; removes this worker's journal."""
+        self.flush()
+        with self._lock:
+            if self.dirty:
+                return  # updates raced in after the flush; leave the journal for adoption
+            with _file_lock(self.lock_path):
+                shared, workers = _read_snapshot(self.path)
+                if workers.pop(self.worker_id, None) is not None:
+                    atomic_write(self.path, json.dumps({"state": shared, "workers": workers}))
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            for f in (self.journal_path, self.journal_path + ".alive"):
+                try:
+                    os.remove(f)
+                except OSError:
+                    pass
+            if self._alive is not None:
+                self._alive.close()
+                self._alive = None
+
+    async def run_flusher(self, interval: float):
+        """Background task: merge every `interval` seconds (also refreshes the shared view)."""
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                await asyncio.to_thread(self.flush)
+        finally:
+            await asyncio.to_thread(self.close)  # flock + final merge: keep them off the loop
 
     def zscore(self, k: str, v: float) -> float:
         s = self.state.get(k)
@@ -61,22 +323,91 @@ class ScoringState:
         # squash to (0,1)
         return 1.0 / (1.0 + math.exp(-z))
 
-scoring_state = ScoringState(settings.scoring_state_path)
+scoring_state = ScoringState(settings.scoring_state_path, flush_every=settings.scoring_flush_every)
 scoring_state.load()
 
+# ----- Array API: (N x F) matrices in a fixed feature order -----
+FEATURES: Tuple[str, ...] = tuple(DEFAULT_WEIGHTS)
+_DEFAULT_W = np.array([DEFAULT_WEIGHTS[k] for k in FEATURES])
+_DEFAULT_SHARE = _DEFAULT_W / _DEFAULT_W.sum()
+
+def feature_stats(keys: Sequence[str] = FEATURES) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(count, mean, 1/std) per key from the current rolling state."""
+    state = scoring_state.state
+    stats = np.array([[s["count"], s["mean"], s["M2"]] for s in (state.get(k) or _EMPTY for k in keys)],
+                     dtype=float).reshape(len(keys), 3)
+    count, mean, M2 = stats.T
+    var = M2 / np.maximum(count - 1.0, 1.0)
+    return count, mean, 1.0 / np.sqrt(np.maximum(var, 1e-12))
+
+def normalize_matrix(X: np.ndarray, keys: Sequence[str] = FEATURES, stats=None) -> np.ndarray:
+    """
+    Z-score sigmoid of raw values X (N x len(keys)) against the rolling stats, in [0,1].
+    Features with < 2 observations are neutral (0.5); NaN (missing) stays NaN.
+    """
+    count, mean, inv_std = stats if stats is not None else feature_stats(keys)
+    Z = np.subtract(X, mean, dtype=float)
+    Z *= -inv_std
+    with np.errstate(over="ignore"):
+        np.exp(Z, out=Z)
+    Z += 1.0
+    np.reciprocal(Z, out=Z)
+    Z[:, count < 2] = np.where(np.isnan(X[:, count < 2]), np.nan, 0.5)
+    return Z
+
+def weight_vector(weights: Dict[str, float] | None = None, keys: Sequence[str] = FEATURES) -> Tuple[np.ndarray, np.ndarray]:
+    """(weights, weights / total) aligned with `keys`; the default is precomputed."""
+    if not weights and tuple(keys) == FEATURES:
+        return _DEFAULT_W, _DEFAULT_SHARE
+    weights = weights or DEFAULT_WEIGHTS
+    w = np.array([weights.get(k, 0.0) for k in keys])
+    return w, w / sum(weights.values())
+
+def risk_matrix(N: np.ndarray, weights: Dict[str, float] | None = None,
+                keys: Sequence[str] = FEATURES) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Weighted risk for normalized rows N (N x len(keys)); missing (NaN) features count as
+    0.5. Returns (risk (N,), contributions (N x F)) where contribution = w * v / sum(w).
+    """
+    w, share = weight_vector(weights, keys)
+    V = np.where(np.isnan(N), 0.5, N)
+    return V @ w, V * share
+
+def score_matrix(X: np.ndarray, weights: Dict[str, float] | None = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Portfolio rescoring: raw (N x F) matrix in FEATURES order -> (normalized, risk,
+    contributions) against the current rolling stats. Does not update the stats.
+    """
+    N = normalize_matrix(X)
+    risk, contrib = risk_matrix(N, weights)
+    return N, risk, contrib
+
+def _to_matrix(raws: List[Dict[str, float]], keys: Sequence[str]) -> np.ndarray:
+    return np.array([[np.nan if raw.get(k) is None else raw[k] for k in keys] for raw in raws],
+                    dtype=float).reshape(len(raws), len(keys))
+
+# ----- Dict API (thin wrappers over the array API) -----
 def normalize_features(raw: Dict[str, float]) -> Dict[str, float]:
     # Update rolling stats then produce normalized values in [0,1] via z-score sigmoid
-    scoring_state.update(raw)
-    return {k: scoring_state.zscore(k, v) for k, v in raw.items() if v is not None}
+    return normalize_features_batch([raw])[0]
+
+def normalize_features_batch(raws: List[Dict[str, float]]) -> List[Dict[str, float]]:
+    """
+    Batch variant: fold every row into the rolling stats once, then z-score all rows
+    against the same state in one NumPy pass (rows in a batch are mutually comparable).
+    """
+    scoring_state.update_many(raws)
+    keys = list(dict.fromkeys(k for raw in raws for k, v in raw.items() if v is not None))
+    if not keys:
+        return [{} for _ in raws]
+    N = normalize_matrix(_to_matrix(raws, keys), keys)
+    present = ~np.isnan(N)
+    return [
+        {k: float(N[i, j]) for j, k in enumerate(keys) if present[i, j]}
+        for i in range(len(raws))
+    ]
 
 def weighted_risk(norm: Dict[str, float], weights: Dict[str, float] = None) -> tuple[float, Dict[str, float]]:
-    if not weights:
-        weights = DEFAULT_WEIGHTS
-    total = sum(weights.values())
-    score = 0.0
-    contrib = {}
-    for k, w in weights.items():
-        val = norm.get(k, 0.5)
-        score += w * val
-        contrib[k] = w * val / total
-    return score, contrib
+    keys = tuple(weights) if weights else FEATURES
+    risk, contrib = risk_matrix(_to_matrix([norm], keys), weights, keys)
+    return float(risk[0]), dict(zip(keys, contrib[0].tolist()))
@@ -0,0 +1,37 @@
+import hashlib
+import math
+
+class HyperLogLog:
+    """
+    Distinct-count sketch: 2**p one-byte registers, ~1.04/sqrt(2**p) relative error
+    (p=12: 4 KB, ~1.6%). Small counts (up to ~10k at p=12) use linear counting.
+    The harmonic sum and the number of empty registers are kept up to date on every
+    add, so count() is O(1).
+    """
+    def __init__(self, p: int = 12):
+        if not 4 <= p <= 16:
+            raise ValueError("HyperLogLog precision must be between 4 and 16")
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+        self._alpha = 0.7213 / (1 + 1.079 / self.m)
+        self._inv_sum = float(self.m)  # sum(2**-r) over registers
+        self._zeros = self.m
+
+    def add(self, item: str):
+        h = int.from_bytes(hashlib.blake2b(item.encode(), digest_size=8).digest(), "big")
+        idx = h >> (64 - self.p)
+        rest = h & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1  # position of the first 1-bit
+        old = self.registers[idx]
+        if rank > old:
+            self.registers[idx] = rank
+            self._inv_sum += 2.0 ** -rank - 2.0 ** -old
+            if old == 0:
+                self._zeros -= 1
+
+    def count(self) -> int:
+        estimate = self._alpha * self.m * self.m / self._inv_sum
+        if estimate <= 2.5 * self.m and self._zeros:
+            estimate = self.m * math.log(self.m / self._zeros)
+        return int(round(estimate))
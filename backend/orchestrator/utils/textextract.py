@@ -0,0 +1,110 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
+
+# Kept free of settings/API imports so spawned worker processes can import it cheaply.
+# Workers are spawned, never forked: by the time the pool starts the server already runs
+# threads (result-store writer, to_thread pool, Gemini executor), and a forked child can
+# inherit a lock one of them was holding and deadlock on it.
+
+_BOILERPLATE = ("script", "style", "noscript", "nav", "header", "footer", "aside", "form", "iframe", "svg", "template")
+_PARSER = lxml.html.HTMLParser(encoding="utf-8", remove_comments=True)
+
+def extract_text_bs4(html: str, max_chars: int = 5000) -> str:
+    soup = BeautifulSoup(html, "lxml")
+    return soup.get_text(separator=" ", strip=True)[:max_chars]
+
+def extract_text_lxml(html: str, max_chars: int = 5000) -> str:
+    """Parse with lxml directly, drop boilerplate subtrees, stop once max_chars is reached."""
+    try:
+        root = lxml.html.fromstring(html.encode("utf-8", errors="replace"), parser=_PARSER)
+    except (etree.ParserError, ValueError):
+        return ""
+    etree.strip_elements(root, *_BOILERPLATE, with_tail=False)
+    parts = []
+    n = 0
+    for t in root.itertext():
+        t = " ".join(t.split())
+        if not t:
+            continue
+        parts.append(t)
+        n += len(t) + 1
+        if n >= max_chars:
+            break
+    return " ".join(parts)[:max_chars]
+
+EXTRACTORS = {"bs4": extract_text_bs4, "lxml": extract_text_lxml}
+
+def extract_batch(htmls: list[str], max_chars: int, extractor: str) -> list[str]:
+    # One pool submission per page batch; failures become empty strings
+    fn = EXTRACTORS.get(extractor, extract_text_bs4)
+    out = []
+    for h in htmls:
+        try:
+            out.append(fn(h, max_chars))
+        except Exception:
+            out.append("")
+    return out
+
+_executor: Executor | None = None
+
+def get_executor(mode: str, workers: int) -> Executor | None:
+    global _executor
+    if mode == "inline":
+        return None
+    if _executor is None:
+        workers = max(1, workers)
+        if mode == "process":
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        else:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="textextract")
+    return _executor
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+def _discard_executor(pool: Executor):
+    # A broken process pool never recovers; the next call builds a fresh one
+    global _executor
+    if _executor is pool:
+        _executor = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+async def _extract_chunk(pool: Executor, htmls: list[str], max_chars: int, extractor: str) -> list[str]:
+    """
+    One pool submission. If the pool itself fails (worker died, arguments/results
+    not picklable, pool shut down) the chunk is extracted in a thread instead, so a
+    pool failure costs speed, not the news agent's result.
+    """
+    try:
+        return await asyncio.get_running_loop().run_in_executor(pool, extract_batch, htmls, max_chars, extractor)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        if isinstance(e, BrokenExecutor):
+            _discard_executor(pool)
+        return await asyncio.to_thread(extract_batch, htmls, max_chars, extractor)
+
+async def extract_texts(htmls: list[str], max_chars: int = 5000, extractor: str = "bs4",
+                        mode: str = "process", workers: int = 2) -> list[str]:
+    """Extract text off the event loop (process pool by default). Empty results are dropped."""
+    if not htmls:
+        return []
+    pool = get_executor(mode, workers)
+    if pool is None:
+        texts = extract_batch(htmls, max_chars, extractor)
+    else:
+        # Round-robin split across workers so pages parse in parallel
+        stride = max(1, min(workers, len(htmls)))
+        chunks = [htmls[i::stride] for i in range(stride)]
+        parts = await asyncio.gather(*(_extract_chunk(pool, c, max_chars, extractor) for c in chunks))
+        texts = [""] * len(htmls)
+        for i, part in enumerate(parts):
+            texts[i::stride] = part
+    return [t for t in texts if t]
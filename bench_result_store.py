@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: analysis history store (orchestrator/history.py)
+Run this from the project root: python bench_result_store.py [--results 100000] [--lanes 500]
+
+Measures the cost record() adds to a request (enqueue only), the background
+writer's sustained insert rate, and an indexed read of one lane's history over
+a time range. Uses a database in a temp dir.
+
+Recorded on a 1-vCPU Linux box, 100k results over 500 lanes:
+  record(): 2.3 us per call; writer ~11.5k rows/s in batches of 256 (~36 us of
+  that per row is building the JSON columns, the rest is SQLite)
+  history(lane, last 24 h): p50 0.67 ms for 25 rows, 0.47 ms for 20 rows,
+  via the (lane, ts) index; most of it is decoding the JSON columns
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from orchestrator.history import ResultStore
+from orchestrator.utils.schema import AnalyzeRequest, AnalyzeResponse, AgentRun, TGNResult
+
+AGENTS = ("geocode", "trade", "news", "weather", "political", "gscpi")
+
+def synthetic(n: int, lanes: int) -> list:
+    now = datetime.now(timezone.utc)
+    inps = [AnalyzeRequest(component_type="chip", seller_location=f"Seller {i}", import_location="San Jose, USA")
+            for i in range(lanes)]
+    base = AnalyzeResponse(
+        request_id="", created_at=now, inputs=inps[0], features={f"f{j}": 0.5 for j in range(7)},
+        tgn_result=TGNResult(risk_score=0.4, risk_label="Medium", risk_components={}),
+        concise=[], comprehensive={"risk_distribution": [], "mitigation_strategies": {}},
+        agents={a: AgentRun(status="ok", latency_ms=120.0) for a in AGENTS},
+    )
+    out = [base.model_copy(update={"request_id": f"r{i}", "created_at": now - timedelta(seconds=(n - i) * 7),
+                                   "inputs": inps[i % lanes]}) for i in range(n)]
+    return out
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--results", type=int, default=100_000)
+    ap.add_argument("--lanes", type=int, default=500)
+    args = ap.parse_args()
+
+    store = ResultStore(os.path.join(tempfile.mkdtemp(), "results.sqlite3"), queue_size=args.results + 1)
+    results = synthetic(args.results, args.lanes)
+    store.start()
+
+    t = time.perf_counter()
+    for r in results:
+        store.record(r)
+    enq = time.perf_counter() - t
+    store.close(timeout=600)
+    total = time.perf_counter() - t
+    print(f"record()  : {enq / len(results) * 1e6:.2f} us per call (request path)")
+    print(f"writer    : {store.counts['written']:,} rows in {total:.2f} s ({store.counts['written'] / total:,.0f} rows/s, "
+          f"{store.counts['batches']} batches, {store.counts['dropped']} dropped)")
+
+    lane = results[-1].inputs
+    since = time.time() - 86400
+    for limit in (100, 20):
+        store.history(lane, since, limit=limit)  # warm the connection
+        lat = []
+        for _ in range(2000):
+            t = time.perf_counter()
+            rows = store.history(lane, since, limit=limit)
+            lat.append(time.perf_counter() - t)
+        print(f"history() : {len(rows)} rows (24 h, limit {limit}), p50 {statistics.median(lat) * 1000:.3f} ms, "
+              f"p99 {sorted(lat)[int(len(lat) * 0.99)] * 1000:.3f} ms")
+    plan = store._reader().execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM analyses WHERE lane = ? AND ts >= ? AND ts <= ? ORDER BY ts DESC LIMIT 100",
+        ("x", 0, 1),
+    ).fetchall()
+    print("plan      :", "; ".join(p[-1] for p in plan))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: BeautifulSoup vs lxml text extraction used by the News Agent
+Run this from the project root: python bench_text_extract.py [--pages 8] [--kb 300] [--repeat 5]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from orchestrator.utils.textextract import extract_text_bs4, extract_text_lxml, extract_texts, shutdown_executor
+
+WORDS = "port congestion strike semiconductor fab delay customs backlog shipment typhoon outage supplier".split()
+
+def synthetic_page(kb: int, seed: int) -> str:
+    """News-like page: nav/script/style boilerplate around many paragraphs."""
+    rnd = random.Random(seed)
+    head = "<html><head><style>" + "body{margin:0}" * 200 + "</style><script>" + "var a=1;" * 500 + "</script></head><body>"
+    nav = "<nav>" + "".join(f"<a href='/s{i}'>Section {i}</a>" for i in range(100)) + "</nav>"
+    body, size = [], 0
+    while size < kb * 1024:
+        p = "<div class='c'><p>" + " ".join(rnd.choice(WORDS) for _ in range(60)) + "</p></div>"
+        body.append(p)
+        size += len(p)
+    return head + nav + "".join(body) + "<footer>Copyright</footer></body></html>"
+
+def bench(fn, pages, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        for h in pages:
+            fn(h, 5000)
+        best = min(best, time.perf_counter() - t)
+    return best
+
+async def bench_loop_block(pages, extractor, mode, repeat):
+    """Longest event-loop stall while extracting (what other requests feel)."""
+    await extract_texts(pages[:2], 5000, extractor=extractor, mode=mode, workers=2)  # warm the pool
+    worst = 0.0
+    for _ in range(repeat):
+        stop = False
+        async def ticker():
+            nonlocal worst
+            last = time.perf_counter()
+            while not stop:
+                await asyncio.sleep(0)
+                now = time.perf_counter()
+                worst = max(worst, now - last)
+                last = now
+        tick = asyncio.create_task(ticker())
+        await asyncio.sleep(0)  # let the ticker start before extraction begins
+        await extract_texts(pages, 5000, extractor=extractor, mode=mode, workers=2)
+        stop = True
+        await tick
+    return worst
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=8)
+    ap.add_argument("--kb", type=int, default=300)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    pages = [synthetic_page(args.kb, i) for i in range(args.pages)]
+    print(f"{args.pages} pages x ~{args.kb} KB, best of {args.repeat}")
+    t_bs4 = bench(extract_text_bs4, pages, args.repeat)
+    t_lxml = bench(extract_text_lxml, pages, args.repeat)
+    print(f"  bs4  : {t_bs4 * 1000:8.1f} ms")
+    print(f"  lxml : {t_lxml * 1000:8.1f} ms  ({t_bs4 / t_lxml:.1f}x faster)")
+
+    print("Longest event-loop stall during extraction:")
+    for extractor in ("bs4", "lxml"):
+        for mode in ("inline", "thread", "process"):
+            worst = asyncio.run(bench_loop_block(pages, extractor, mode, args.repeat))
+            shutdown_executor()
+            print(f"  {extractor:4s} / {mode:7s}: {worst * 1000:8.2f} ms")
+
+if __name__ == "__main__":
+    main()
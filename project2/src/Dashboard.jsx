@@ -543,12 +543,10 @@ const Dashboard = () => {
                 </div>
                 <div className="stat-item">
                   <div className="stat-item__value">
-                    {analyticsData ? analyticsData.active_routes : '24'}
-                  </div>
-                  <div className="stat-item__label">Active Routes</div>
-                  <div className="stat-item__status stat-item__status--success">
-                    {analyticsData ? `+12% this week` : '+12% this week'}
+                    {analyticsData ? analyticsData.routes_seen : '24'}
                   </div>
+                  <div className="stat-item__label">Routes Analyzed</div>
+                  <div className="stat-item__status stat-item__status--success">All time</div>
                 </div>
                 <div className="stat-item">
                   <div className="stat-item__value">
@@ -559,10 +557,10 @@ const Dashboard = () => {
                 </div>
                 <div className="stat-item">
                   <div className="stat-item__value">
-                    {analyticsData ? `${analyticsData.reliability_score}%` : '89%'}
+                    {analyticsData?.inverse_risk_score != null ? `${analyticsData.inverse_risk_score}/100` : '—'}
                   </div>
-                  <div className="stat-item__label">Reliability</div>
-                  <div className="stat-item__status stat-item__status--success">+3% improved</div>
+                  <div className="stat-item__label">Inverse Risk Score</div>
+                  <div className="stat-item__status stat-item__status--success">100 − mean risk</div>
                 </div>
               </div>
             </div>
@@ -577,11 +575,10 @@ const Dashboard = () => {
                 trend="+5%"
               />
               <MetricCard 
-                title="Active Routes"
-                value={analyticsData ? analyticsData.active_routes.toString() : "24"}
-                subtitle="Monitored Pathways"
+                title="Routes Analyzed"
+                value={analyticsData ? analyticsData.routes_seen.toString() : "24"}
+                subtitle="Distinct lanes, all time"
                 icon={Route}
-                trend="+12%"
               />
               <MetricCard 
                 title="Disruption Alerts"
@@ -590,11 +587,10 @@ const Dashboard = () => {
                 icon={AlertTriangle}
               />
               <MetricCard 
-                title="Reliability Score"
-                value={analyticsData ? `${analyticsData.reliability_score}%` : "89%"}
-                subtitle="On-time Delivery Rate"
+                title="Inverse Risk Score"
+                value={analyticsData?.inverse_risk_score != null ? `${analyticsData.inverse_risk_score}/100` : "—"}
+                subtitle="100 − mean risk, all analyses"
                 icon={TrendingUp}
-                trend="+3%"
               />
             </div>
 
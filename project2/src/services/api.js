@@ -43,9 +43,38 @@ class ApiService {
     });
   }
 
+  // Stream agent-by-agent progress (SSE). `onEvent(eventName, data)` is called for
+  // "agent", "features", "tgn_result", "result" and "error"; returns a close() function.
+  analyzeSupplyChainStream(data, onEvent) {
+    const params = new URLSearchParams();
+    ['component_type', 'seller_location', 'import_location', 'seller_name'].forEach((key) => {
+      if (data[key]) params.append(key, data[key]);
+    });
+    const source = new EventSource(`${this.baseURL}/analyze/stream?${params}`);
+    ['agent', 'features', 'tgn_result'].forEach((name) => {
+      source.addEventListener(name, (e) => onEvent(name, JSON.parse(e.data)));
+    });
+    source.addEventListener('result', (e) => {
+      onEvent('result', JSON.parse(e.data));
+      source.close();
+    });
+    source.addEventListener('error', (e) => {
+      onEvent('error', e.data ? JSON.parse(e.data) : { error: 'connection lost' });
+      source.close();
+    });
+    return () => source.close();
+  }
+
   // Get real-time alerts
-  async getAlerts() {
-    return this.request('/monitoring/alerts');
+  async getAlerts(since = 0) {
+    return this.request(`/monitoring/alerts?since=${since}`);
+  }
+
+  // Live alerts over WebSocket; onMessage gets {type: 'snapshot'|'alert'|'lagged', ...}
+  subscribeAlerts(onMessage, since = 0) {
+    const socket = new WebSocket(`${this.baseURL.replace(/^http/, 'ws')}/monitoring/alerts/ws?since=${since}`);
+    socket.onmessage = (e) => onMessage(JSON.parse(e.data));
+    return () => socket.close();
   }
 
   // Get analytics overview
@@ -22,7 +22,7 @@ async function testBackendConnection() {
             console.log('❌ Model info missing expected properties');
         }
         
-        if (analyticsData.active_routes && analyticsData.active_alerts && analyticsData.reliability_score) {
+        if (analyticsData.routes_seen != null && analyticsData.active_alerts != null && 'inverse_risk_score' in analyticsData) {
             console.log('✅ Analytics data has expected properties');
         } else {
             console.log('❌ Analytics data missing expected properties');
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Refresh backend/data/gscpi_seed.csv from the NY Fed's published GSCPI history
+Run this from the project root: python update_gscpi_seed.py [--url URL] [--out backend/data/gscpi_seed.csv]
+
+Run it at build/deploy time (and commit the result when you want to pin it) so a fresh
+deploy starts with the full monthly series: the GSCPI agent then never has to fetch
+inline on the first request, and the alert engine has a baseline from the start.
+"""
+
+import argparse
+import os
+import sys
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+from orchestrator.utils.gscpi_store import parse_published
+from orchestrator.utils.fileutils import atomic_write
+from config.settings import settings
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--url", default=settings.gscpi_history_url)
+    ap.add_argument("--out", default=os.path.join("backend", "data", "gscpi_seed.csv"))
+    args = ap.parse_args()
+
+    r = httpx.get(args.url, follow_redirects=True, timeout=60)
+    r.raise_for_status()
+    series = parse_published(r.content)
+    if not series:
+        raise SystemExit(f"No GSCPI rows found in {args.url}")
+
+    lines = ["month,value"] + [f"{m},{series[m]}" for m in sorted(series)]
+    atomic_write(args.out, "\n".join(lines) + "\n")
+    first, last = min(series), max(series)
+    print(f"Wrote {len(series)} months ({first} .. {last}, latest {series[last]:+.2f}) to {args.out}")
+
+if __name__ == "__main__":
+    main()